@@ -0,0 +1,56 @@
+"""Представление моделей в JSON.
+
+Поля описаны словарями «имя → функция», клиент может запросить
+подмножество через `?fields=id,text` (sparse fieldsets).
+"""
+from django.core.exceptions import ValidationError
+
+POST_FIELDS = {
+    'id': lambda post: post.pk,
+    'text': lambda post: post.text,
+    'pub_date': lambda post: post.pub_date.isoformat(),
+    'updated_at': lambda post: post.updated_at.isoformat(),
+    'author': lambda post: post.author.username,
+    'group': lambda post: post.group.slug if post.group_id else None,
+    'image': lambda post: post.image.url if post.image else None,
+    'comments_count': lambda post: post.comments_count,
+}
+
+# Поля, которые отдаются только на странице поста.
+POST_DETAIL_FIELDS = {
+    **POST_FIELDS,
+    'comments': lambda post: {
+        'results': [
+            serialize_comment(comment) for comment in post.comment_list
+        ],
+        'next': post.comments_next,
+    },
+}
+
+COMMENT_FIELDS = {
+    'id': lambda comment: comment.pk,
+    'text': lambda comment: comment.text,
+    'author': lambda comment: comment.author.username,
+    'created': lambda comment: comment.created.isoformat(),
+}
+
+
+def parse_fields(value, available):
+    """Список запрошенных полей; без параметра — все поля."""
+    if not value:
+        return list(available)
+    fields = [name for name in value.split(',') if name]
+    unknown = set(fields) - set(available)
+    if unknown:
+        raise ValidationError(
+            f'Неизвестные поля: {", ".join(sorted(unknown))}'
+        )
+    return fields
+
+
+def serialize(obj, fields, available):
+    return {name: available[name](obj) for name in fields}
+
+
+def serialize_comment(comment):
+    return serialize(comment, COMMENT_FIELDS, COMMENT_FIELDS)
@@ -0,0 +1,198 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Test_Api_Reader')
+        cls.author = User.objects.create_user(username='Test_Api_Author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа API',
+            slug='api_slug',
+            description='Тестовый дескрипшн'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Тестовый пост {i}'
+            )
+            for i in range(3)
+        ]
+        cls.post = cls.posts[-1]
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text='Тестовый комментарий'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_feeds_are_cursor_paginated(self):
+        """Ленты отдаются страницами со ссылкой на следующую."""
+        urls = (
+            reverse('api:v1:posts'),
+            reverse('api:v1:group_posts', args=(self.group.slug,)),
+            reverse('api:v1:profile_posts', args=(self.author.username,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.guest_client.get(url, {'limit': 2}).json()
+                self.assertEqual(
+                    [post['id'] for post in data['results']],
+                    [self.posts[2].pk, self.posts[1].pk],
+                )
+                data = self.guest_client.get(data['next']).json()
+                self.assertEqual(
+                    [post['id'] for post in data['results']],
+                    [self.posts[0].pk],
+                )
+                self.assertIsNone(data['next'])
+
+    def test_sparse_fieldsets(self):
+        """Параметр fields ограничивает набор полей."""
+        data = self.guest_client.get(
+            reverse('api:v1:posts'), {'fields': 'id,author'}
+        ).json()
+        self.assertEqual(
+            data['results'][0],
+            {'id': self.post.pk, 'author': self.author.username},
+        )
+        response = self.guest_client.get(
+            reverse('api:v1:posts'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_post_detail_with_comments(self):
+        """Пост отдаётся с первой страницей комментариев за фиксированное
+        число запросов."""
+        url = reverse('api:v1:post_detail', args=(self.post.pk,))
+        self.guest_client.get(url)
+        # Ключ ETag, версии его тегов, пост, комментарии.
+        with self.assertNumQueries(4):
+            data = self.guest_client.get(url).json()
+        self.assertEqual(data['group'], self.group.slug)
+        self.assertEqual(
+            [comment['text'] for comment in data['comments']['results']],
+            ['Тестовый комментарий'],
+        )
+        self.assertIsNone(data['comments']['next'])
+        response = self.guest_client.get(
+            reverse('api:v1:post_detail', args=(0,))
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'detail': 'Не найдено'})
+
+    @override_settings(COMMENTS_PER_PAGE=2)
+    def test_post_comments_paginated(self):
+        """Комментарии поста листаются по ссылке next."""
+        for i in range(2):
+            Comment.objects.create(
+                post=self.post, author=self.user, text=f'Комментарий {i}'
+            )
+        url = reverse('api:v1:post_detail', args=(self.post.pk,))
+        comments = self.guest_client.get(
+            url, {'fields': 'id,comments'}
+        ).json()['comments']
+        self.assertEqual(len(comments['results']), 2)
+        data = self.guest_client.get(comments['next']).json()
+        self.assertEqual(len(data['comments']['results']), 1)
+        self.assertIsNone(data['comments']['next'])
+
+    def test_etag_revalidation(self):
+        """Повторный запрос с If-None-Match получает 304 без тела."""
+        url = reverse('api:v1:post_detail', args=(self.post.pk,))
+        etag = self.guest_client.get(url)['ETag']
+        with self.assertNumQueries(2):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Новый комментарий'
+        )
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_feed_etag_checked_before_rendering(self):
+        """ETag ленты берётся из версий тегов: 304 не читает посты."""
+        Follow.objects.create(user=self.user, author=self.author)
+        urls = (
+            reverse('api:v1:posts'),
+            reverse('api:v1:group_posts', args=(self.group.slug,)),
+            reverse('api:v1:profile_posts', args=(self.author.username,)),
+            reverse('api:v1:follow_posts'),
+        )
+        etags = {}
+        for url in urls:
+            with self.subTest(url=url):
+                etags[url] = self.authorized_client.get(url)['ETag']
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.authorized_client.get(
+                        url, HTTP_IF_NONE_MATCH=etags[url]
+                    )
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse([
+                    query for query in queries
+                    if 'posts_post' in query['sql']
+                ])
+        Post.objects.create(
+            author=self.author, group=self.group, text='Новый пост'
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_follow_and_follow_feed(self):
+        """Подписка идемпотентна и наполняет ленту подписок."""
+        feed_url = reverse('api:v1:follow_posts')
+        follow_url = reverse('api:v1:follow', args=(self.author.username,))
+        self.assertEqual(self.guest_client.get(feed_url).status_code, 401)
+        self.assertEqual(
+            self.authorized_client.post(follow_url).status_code, 201
+        )
+        self.assertEqual(
+            self.authorized_client.post(follow_url).status_code, 200
+        )
+        self.assertEqual(Follow.objects.filter(user=self.user).count(), 1)
+        data = self.authorized_client.get(feed_url).json()
+        self.assertEqual(len(data['results']), len(self.posts))
+        self.authorized_client.delete(follow_url)
+        self.assertFalse(Follow.objects.filter(user=self.user).exists())
+        self.assertEqual(
+            self.authorized_client.get(follow_url).status_code, 405
+        )
+
+    def test_bulk_follow(self):
+        """Подписка списком возвращает изменившиеся и неизвестные имена."""
+        url = reverse('api:v1:follow_many')
+        body = {'usernames': [self.author.username, 'Test_Api_Nobody']}
+        data = self.authorized_client.post(
+            url, body, content_type='application/json'
+        ).json()
+        self.assertEqual(data, {
+            'changed': [self.author.username], 'unknown': ['Test_Api_Nobody'],
+        })
+        data = self.authorized_client.post(
+            url, body, content_type='application/json'
+        ).json()
+        self.assertEqual(data['changed'], [])
+        data = self.authorized_client.delete(
+            url, body, content_type='application/json'
+        ).json()
+        self.assertEqual(data['changed'], [self.author.username])
+        self.assertFalse(Follow.objects.filter(user=self.user).exists())
+        response = self.authorized_client.post(
+            url, {'usernames': 'Test_Api_Author'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,30 @@
+from django.urls import include, path
+from . import views
+
+app_name = 'api'
+
+v1 = [
+    path('posts/', views.post_list, name='posts'),
+    path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path(
+        'groups/<slug:slug>/posts/',
+        views.group_posts,
+        name='group_posts'
+    ),
+    path(
+        'profiles/<str:username>/posts/',
+        views.profile_posts,
+        name='profile_posts'
+    ),
+    path(
+        'profiles/<str:username>/follow/',
+        views.follow,
+        name='follow'
+    ),
+    path('follow/', views.follow_many, name='follow_many'),
+    path('follow/posts/', views.follow_posts, name='follow_posts'),
+]
+
+urlpatterns = [
+    path('v1/', include((v1, 'v1'))),
+]
@@ -0,0 +1,131 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponseNotModified, JsonResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+from core.cache import tag_versions
+from posts.utils import CURSOR_PARAM, CursorPaginator
+from .serializers import parse_fields, serialize
+
+
+def error(status, detail):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def make_etag(*parts):
+    """Сильный ETag из частей (строк или байтов)."""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def tagged_etag(tags):
+    """ETag ленты из версий тегов её HTML-страницы (как
+    `posts.conditional.tagged`), адреса с курсором и пользователя."""
+    def etag(request, *args, **kwargs):
+        page_tags = tags(request, *args, **kwargs)
+        if page_tags is None:
+            return None
+        return make_etag(
+            request.get_full_path(), request.user.pk,
+            *tag_versions(page_tags),
+        )
+    return etag
+
+
+def set_etag(request, response, etag=None):
+    """ETag (по умолчанию — по телу ответа) и 304 при совпадении
+    If-None-Match."""
+    response['ETag'] = etag or make_etag(response.content)
+    return get_conditional_response(
+        request, etag=response['ETag'], response=response
+    ) or response
+
+
+def not_modified(etag):
+    response = HttpResponseNotModified()
+    response['ETag'] = etag
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def api_view(*methods, login_required=False, etag=None):
+    """Общая обвязка JSON-view: методы, авторизация, ошибки и ETag.
+
+    `etag(request, *args, **kwargs)` считает ETag до вызова view, чтобы
+    на совпавший If-None-Match ответить 304, не собирая тело. Без него
+    ETag считается по готовому телу.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                response = error(405, 'Метод не поддерживается')
+                response['Allow'] = ', '.join(methods)
+                return response
+            if login_required and not request.user.is_authenticated:
+                return error(401, 'Требуется авторизация')
+            tag = etag and request.method == 'GET' and etag(
+                request, *args, **kwargs
+            )
+            if tag and get_conditional_response(request, etag=tag):
+                return not_modified(tag)
+            try:
+                response = view(request, *args, **kwargs)
+            except Http404:
+                return error(404, 'Не найдено')
+            except ValidationError as exc:
+                return error(400, exc.messages)
+            patch_vary_headers(response, ('Cookie',))
+            if request.method == 'GET' and response.status_code == 200:
+                response = set_etag(request, response, tag)
+            return response
+        return wrapper
+    return decorator
+
+
+def parse_usernames(request):
+    """Список имён пользователей из JSON-тела `{"usernames": [...]}`."""
+    try:
+        usernames = json.loads(request.body or b'{}').get('usernames')
+    except (ValueError, AttributeError):
+        raise ValidationError('Тело запроса должно быть JSON-объектом')
+    if not isinstance(usernames, list) or not all(
+        isinstance(username, str) for username in usernames
+    ):
+        raise ValidationError('usernames должен быть списком строк')
+    if len(usernames) > settings.FOLLOW_BULK_LIMIT:
+        raise ValidationError(
+            f'Не больше {settings.FOLLOW_BULK_LIMIT} имён за запрос'
+        )
+    return usernames
+
+
+def page_link(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query[CURSOR_PARAM] = cursor
+    return request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+
+def paginated_response(request, queryset, available):
+    """Страница записей с курсорами соседних страниц."""
+    fields = parse_fields(request.GET.get('fields'), available)
+    try:
+        limit = int(request.GET.get('limit', settings.COUNT_OF_MESSAGES))
+    except ValueError:
+        raise ValidationError('limit должен быть числом')
+    limit = min(max(limit, 1), settings.API_MAX_PAGE_SIZE)
+    paginator = CursorPaginator(queryset, limit)
+    page = paginator.get_page(request.GET.get(CURSOR_PARAM))
+    return JsonResponse({
+        'results': [serialize(obj, fields, available) for obj in page],
+        'next': page_link(request, paginator.next_cursor),
+        'previous': page_link(request, paginator.previous_cursor),
+    })
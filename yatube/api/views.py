@@ -0,0 +1,117 @@
+from django.db import transaction
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+
+from core.cache import tag_versions
+from core.db_router import pin_primary, read_replica
+from posts import feed, follows, page_cache
+from posts.models import Group, Post, User
+from posts.utils import CURSOR_PARAM
+from posts.views import comment_page
+from .serializers import (
+    POST_DETAIL_FIELDS, POST_FIELDS, parse_fields, serialize,
+)
+from .utils import (
+    api_view, make_etag, page_link, paginated_response, parse_usernames,
+    tagged_etag,
+)
+
+
+@read_replica
+@api_view('GET', etag=tagged_etag(page_cache.index_tags))
+def post_list(request):
+    return paginated_response(
+        request, Post.objects.for_feed(images=False), POST_FIELDS
+    )
+
+
+@read_replica
+@api_view('GET', etag=tagged_etag(page_cache.group_tags))
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return paginated_response(
+        request, group.posts.for_feed(images=False), POST_FIELDS
+    )
+
+
+@read_replica
+@api_view('GET', etag=tagged_etag(page_cache.profile_tags))
+def profile_posts(request, username):
+    author = get_object_or_404(User, username=username)
+    return paginated_response(
+        request, author.posts.for_feed(images=False), POST_FIELDS
+    )
+
+
+def post_etag(request, post_id):
+    """ETag поста: дата изменения и версии тегов его страницы."""
+    row = Post.objects.filter(pk=post_id).values_list(
+        'updated_at', 'author__username', 'group'
+    ).first()
+    if row is None:
+        return None
+    updated_at, username, group_id = row
+    return make_etag(
+        request.get_full_path(), updated_at.isoformat(),
+        *tag_versions(page_cache.detail_tags(post_id, username, group_id)),
+    )
+
+
+@read_replica
+@api_view('GET', etag=post_etag)
+def post_detail(request, post_id):
+    """Пост; с `?fields=comments` — первая страница веток комментариев
+    и ссылка `next` на следующую (курсор в `?cursor=`)."""
+    fields = parse_fields(request.GET.get('fields'), POST_DETAIL_FIELDS)
+    post = get_object_or_404(Post.objects.for_feed(images=False), pk=post_id)
+    if 'comments' in fields:
+        page = comment_page(post.pk, request.GET.get(CURSOR_PARAM))
+        post.comment_list = page
+        post.comments_next = page_link(request, page.paginator.next_cursor)
+    return JsonResponse(serialize(post, fields, POST_DETAIL_FIELDS))
+
+
+@read_replica
+@api_view(
+    'GET', login_required=True, etag=tagged_etag(page_cache.follow_tags)
+)
+def follow_posts(request):
+    posts = feed.follow_feed(request.user).for_feed(images=False)
+    return paginated_response(request, posts, POST_FIELDS)
+
+
+@pin_primary
+@api_view('POST', 'DELETE', login_required=True)
+@transaction.atomic
+def follow(request, username):
+    """POST подписывает на автора, DELETE отписывает; оба идемпотентны."""
+    author = get_object_or_404(User, username=username)
+    if request.method == 'DELETE':
+        follows.unfollow(request.user, [author])
+        return JsonResponse({'following': False})
+    if author == request.user:
+        return JsonResponse(
+            {'detail': 'Нельзя подписаться на себя'}, status=400
+        )
+    created = follows.follow(request.user, [author])
+    return JsonResponse({'following': True}, status=201 if created else 200)
+
+
+@pin_primary
+@api_view('POST', 'DELETE', login_required=True)
+@transaction.atomic
+def follow_many(request):
+    """Подписка на список авторов (POST) или отписка от них (DELETE).
+
+    Тело — `{"usernames": [...]}`; в ответе — имена, подписка на которых
+    изменилась, и имена, которых нет.
+    """
+    authors, unknown = follows.authors_by_username(parse_usernames(request))
+    if request.method == 'DELETE':
+        changed = follows.unfollow(request.user, authors)
+    else:
+        changed = follows.follow(request.user, authors)
+    return JsonResponse({
+        'changed': sorted(author.username for author in changed),
+        'unknown': unknown,
+    })
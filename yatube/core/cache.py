@@ -0,0 +1,234 @@
+"""Кеш страниц с защитой от «стампиды» (cache stampede).
+
+Запись в кеше хранит ответ, момент логического истечения и время,
+которое заняла генерация. Физически запись живёт дольше (`grace`),
+чтобы во время пересборки остальные воркеры отдавали устаревшую копию.
+
+Пересборку начинает один воркер: либо заранее, по вероятностному
+правилу XFetch, либо после истечения, захватив блокировку через
+`cache.add`. Остальные продолжают отдавать имеющуюся копию.
+
+`shell_cache_page` кеширует общий для всех «каркас» страницы, а
+персональные части подставляет при отдаче (см. `core.esi`). Такие
+записи живут долго и сбрасываются событиями: страница помечена тегами,
+у каждого тега в кеше лежит текущая версия, и `invalidate(tag)` меняет
+её, делая устаревшими все страницы с этим тегом.
+"""
+import hashlib
+import math
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.utils.cache import (
+    has_vary_header, patch_cache_control, patch_vary_headers,
+)
+
+from . import esi, metrics
+
+HIT = 'hit'
+MISS = 'miss'
+STALE = 'stale'
+REGENERATION = 'regeneration'
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _record(event):
+    with _stats_lock:
+        _stats[event] += 1
+    metrics.count_cache(event)
+
+
+def stats():
+    """Счётчики кеша страниц текущего процесса."""
+    with _stats_lock:
+        return {
+            event: _stats[event]
+            for event in (HIT, MISS, STALE, REGENERATION)
+        }
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def should_recompute(expires, delta, beta=None, now=None):
+    """Правило XFetch: чем ближе истечение и дороже сборка, тем
+    вероятнее досрочная пересборка."""
+    if beta is None:
+        beta = settings.PAGE_CACHE_BETA
+    if now is None:
+        now = time.time()
+    return now - delta * beta * math.log(1 - random.random()) >= expires
+
+
+def _cacheable(request, response):
+    if response.streaming or response.status_code != 200:
+        return False
+    if (
+        not request.COOKIES and response.cookies
+        and has_vary_header(response, 'Cookie')
+    ):
+        return False
+    return 'private' not in response.get('Cache-Control', ())
+
+
+def _tag_key(tag):
+    return f'page_tag:{tag}'
+
+
+def tag_versions(tags, cache_alias='default'):
+    """Текущие версии тегов; у новых тегов версия создаётся."""
+    cache = caches[cache_alias]
+    keys = [_tag_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    for key in missing:
+        cache.add(key, uuid.uuid4().hex, None)
+    if missing:
+        versions.update(cache.get_many(missing))
+    return tuple(versions.get(key) for key in keys)
+
+
+def invalidate(*tags, cache_alias='default'):
+    """Сбрасывает страницы с любым из тегов.
+
+    Внутри транзакции версии меняются ещё раз после фиксации, чтобы
+    страница, собранная до коммита по старым данным, не осталась в кеше.
+    """
+    if not tags:
+        return
+
+    def bump():
+        caches[cache_alias].set_many(
+            {_tag_key(tag): uuid.uuid4().hex for tag in tags}, None
+        )
+
+    bump()
+    if connection.in_atomic_block:
+        transaction.on_commit(bump)
+
+
+def _shell_key(request, key_prefix, per_user):
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    user = request.user.pk if per_user else ''
+    return f'page_shell.{key_prefix}.{url}.{user}'
+
+
+def _assembled(request, entry, status):
+    shell, anonymous, content_type = entry[:3]
+    if anonymous is not None and not request.user.is_authenticated:
+        # В анонимной копии остались только метки общих фрагментов.
+        content = esi.assemble(request, anonymous)
+    else:
+        content = esi.assemble(request, shell)
+    response = HttpResponse(content, content_type=content_type)
+    response['X-Cache'] = status
+    return response
+
+
+def _personal(request, response):
+    patch_vary_headers(response, ('Cookie',))
+    if request.user.is_authenticated:
+        patch_cache_control(response, private=True)
+    return response
+
+
+def _render_shell(view, request, *args, **kwargs):
+    """Рендерит каркас с метками фрагментов и собирает из него ответ.
+
+    Возвращает ещё и каркас с фрагментами текущего пользователя, но с
+    метками общих фрагментов — из него кешируется анонимная копия.
+    """
+    started = time.monotonic()
+    request.esi_deferred = True
+    try:
+        response = view(request, *args, **kwargs)
+    finally:
+        request.esi_deferred = False
+    delta = time.monotonic() - started
+    shell = personal = None
+    if not response.streaming:
+        shell = response.content.decode(response.charset)
+        personal = esi.assemble(request, shell, keep_shared=True)
+        response.content = esi.assemble(request, personal)
+    return response, shell, personal, delta
+
+
+def shell_cache_page(
+    timeout=None, tags=None, per_user=False, key_prefix='',
+    cache_alias='default',
+):
+    """Кеш каркаса страницы с персональными ESI-фрагментами.
+
+    `tags(request, *args, **kwargs)` возвращает теги страницы или None,
+    если страницу кешировать не нужно. С `per_user=True` каркас свой у
+    каждого пользователя (лента подписок). Анонимная версия страницы
+    хранится собранной целиком, кроме общих фрагментов (см. `core.esi`).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (
+                request.method not in ('GET', 'HEAD')
+                or not settings.PAGE_CACHE_ENABLED
+            ):
+                return view(request, *args, **kwargs)
+            page_tags = tags(request, *args, **kwargs) if tags else ()
+            if page_tags is None:
+                return view(request, *args, **kwargs)
+            ttl = timeout or settings.PAGE_CACHE_TIMEOUT
+            cache = caches[cache_alias]
+            versions = tag_versions(page_tags, cache_alias)
+            cache_key = _shell_key(request, key_prefix, per_user)
+            entry = cache.get(cache_key)
+            lock_key = None
+            if entry is not None:
+                fresh = entry[3] == versions
+                if fresh and not should_recompute(entry[4], entry[5]):
+                    _record(HIT)
+                    return _personal(
+                        request, _assembled(request, entry, 'HIT')
+                    )
+                lock_key = f'{cache_key}.lock'
+                if not cache.add(lock_key, 1, settings.PAGE_CACHE_LOCK_TTL):
+                    _record(STALE)
+                    return _personal(
+                        request, _assembled(request, entry, 'STALE')
+                    )
+                _record(REGENERATION)
+            else:
+                _record(MISS)
+            try:
+                response, shell, personal, delta = _render_shell(
+                    view, request, *args, **kwargs
+                )
+                if shell is not None and _cacheable(request, response):
+                    anonymous = (
+                        None if request.user.is_authenticated else personal
+                    )
+                    cache.set(
+                        cache_key,
+                        (
+                            shell, anonymous, response['Content-Type'],
+                            versions, time.time() + ttl, delta,
+                        ),
+                        ttl + settings.PAGE_CACHE_GRACE,
+                    )
+            finally:
+                if lock_key is not None:
+                    cache.delete(lock_key)
+            response['X-Cache'] = 'MISS'
+            return _personal(request, response)
+        return wrapper
+    return decorator
@@ -0,0 +1,7 @@
+"""Обёртки стандартных бэкендов БД для постоянных соединений.
+
+Соединения переживают запрос (`CONN_MAX_AGE`) и перед первым
+использованием в новом запросе проверяются (`CONN_HEALTH_CHECKS`).
+SQLite-бэкенд вдобавок держит пул открытых соединений (`POOL_SIZE`)
+и настраивает каждое новое соединение прагмами (`PRAGMAS`).
+"""
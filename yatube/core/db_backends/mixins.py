@@ -0,0 +1,84 @@
+import queue
+import threading
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class HealthCheckMixin:
+    """Проверяет сохранённое соединение перед первым запросом к нему.
+
+    Без проверки соединение, оборванное сервером БД между запросами,
+    обнаруживается только ошибкой в середине обработки запроса.
+    """
+
+    health_check_pending = False
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_pending = (
+            self.connection is not None
+            and self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+        )
+
+    def ensure_connection(self):
+        if self.health_check_pending:
+            self.health_check_pending = False
+            if not self.in_atomic_block and not self.is_usable():
+                # Сломанное соединение не должно вернуться в пул.
+                self.errors_occurred = True
+                self.close()
+        super().ensure_connection()
+
+
+class PoolMixin:
+    """Пул открытых соединений, общий для потоков процесса.
+
+    Закрываемое соединение возвращается в пул, а новое берётся из пула,
+    если там есть живое. Размер пула — `POOL_SIZE`, 0 отключает пул.
+    """
+
+    def pool(self):
+        size = self.settings_dict.get('POOL_SIZE', 0)
+        if not size or self.is_in_memory_db():
+            return None
+        key = (self.alias, self.settings_dict['NAME'])
+        with _pools_lock:
+            if key not in _pools:
+                _pools[key] = queue.LifoQueue(maxsize=size)
+            return _pools[key]
+
+    def ping(self, connection):
+        raise NotImplementedError
+
+    # Взято ли текущее соединение из пула, а не открыто заново.
+    connection_reused = False
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool()
+        while pool is not None:
+            try:
+                connection = pool.get_nowait()
+            except queue.Empty:
+                break
+            if self.ping(connection):
+                self.connection_reused = True
+                return connection
+            connection.close()
+        self.connection_reused = False
+        connection = super().get_new_connection(conn_params)
+        self.configure_connection(connection)
+        return connection
+
+    def configure_connection(self, connection):
+        """Настраивает только что открытое, не взятое из пула соединение."""
+
+    def _close(self):
+        pool = self.pool()
+        if pool is None or self.in_atomic_block or self.errors_occurred:
+            return super()._close()
+        try:
+            self.connection.rollback()
+            pool.put_nowait(self.connection)
+        except (queue.Full, self.Database.Error):
+            super()._close()
@@ -0,0 +1,11 @@
+from django.db.backends.postgresql import base
+
+from ..mixins import HealthCheckMixin
+
+
+class DatabaseWrapper(HealthCheckMixin, base.DatabaseWrapper):
+    """PostgreSQL с проверкой постоянных соединений.
+
+    Пул между процессами держит внешний пулер (PgBouncer), поэтому
+    здесь собственного пула нет.
+    """
@@ -0,0 +1,23 @@
+from django.db.backends.sqlite3 import base
+
+from ..mixins import HealthCheckMixin, PoolMixin
+
+
+class DatabaseWrapper(HealthCheckMixin, PoolMixin, base.DatabaseWrapper):
+    def ping(self, connection):
+        try:
+            connection.execute('SELECT 1')
+        except self.Database.Error:
+            return False
+        return True
+
+    def configure_connection(self, connection):
+        for name, value in self.settings_dict.get('PRAGMAS', {}).items():
+            connection.execute(f'PRAGMA {name} = {value}')
+
+    def _start_transaction_under_autocommit(self):
+        # BEGIN IMMEDIATE берёт блокировку записи сразу: отложенная
+        # транзакция, начавшаяся с чтения, при записи из другого процесса
+        # падает с «database is locked», не дожидаясь busy_timeout.
+        mode = self.settings_dict.get('TRANSACTION_MODE')
+        self.cursor().execute(f'BEGIN {mode}' if mode else 'BEGIN')
@@ -0,0 +1,95 @@
+"""Чтение с реплик для помеченных view.
+
+View, помеченные `read_replica`, читают модели приложений из
+`DATABASE_REPLICA_APPS` со случайной реплики из `DATABASE_REPLICAS`;
+всё остальное, включая любые записи, идёт в `default`.
+
+После view, помеченного `pin_primary`, клиенту ставится кука, и
+`DATABASE_PRIMARY_PIN` секунд его чтения идут в `default`: так автор
+сразу видит свой пост или комментарий, даже если реплика отстаёт.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+PRIMARY = 'default'
+PIN_COOKIE = 'pin_primary'
+
+_state = threading.local()
+
+
+def read_replica(view):
+    """Помечает view как читающий только данные, которые могут отставать."""
+    view.read_replica = True
+    return view
+
+
+def pin_primary(view):
+    """Помечает пишущий view: после него клиент читает с основной БД."""
+    view.pin_primary = True
+    return view
+
+
+@contextmanager
+def replica_reads():
+    """Чтения внутри блока идут на реплику."""
+    previous = reading_from_replica()
+    _state.replica = True
+    try:
+        yield
+    finally:
+        _state.replica = previous
+
+
+def reading_from_replica():
+    return getattr(_state, 'replica', False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (
+            replicas and reading_from_replica()
+            and model._meta.app_label in settings.DATABASE_REPLICA_APPS
+        ):
+            return random.choice(replicas)
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Включает чтение с реплики на время помеченного view."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.replica = False
+        if getattr(request, 'pins_primary', False) and (
+            response.status_code < 400
+        ):
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.DATABASE_PRIMARY_PIN, httponly=True,
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.pins_primary = getattr(view_func, 'pin_primary', False)
+        _state.replica = (
+            getattr(view_func, 'read_replica', False)
+            and PIN_COOKIE not in request.COOKIES
+        )
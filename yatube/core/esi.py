@@ -0,0 +1,60 @@
+"""Персональные фрагменты страниц в духе Edge Side Includes.
+
+Страница кешируется как общий для всех «каркас»: на местах, зависящих
+от пользователя (меню, кнопка подписки, форма комментария), при
+рендеринге каркаса остаются метки `<!--esi name params-->`. При отдаче
+страницы каждая метка заменяется фрагментом, отрисованным для текущего
+пользователя. Фрагмент — маленький шаблон и функция, собирающая для
+него контекст; регистрируются декоратором `fragment`.
+
+Общий фрагмент (`shared=True`) от пользователя не зависит, но меняется
+чаще каркаса (счётчик просмотров). Его метка остаётся и в собранной
+анонимной копии страницы, поэтому он рисуется заново при каждой отдаче.
+"""
+import re
+from urllib.parse import parse_qsl, urlencode
+
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+MARKER = re.compile(r'<!--esi (\w+) ([^>]*)-->')
+
+_fragments = {}
+_shared = set()
+
+
+def fragment(name, template, shared=False):
+    """Регистрирует функцию контекста персонального фрагмента."""
+    def decorator(func):
+        _fragments[name] = (template, func)
+        if shared:
+            _shared.add(name)
+        return func
+    return decorator
+
+
+def render_fragment(request, name, params):
+    template, func = _fragments[name]
+    return render_to_string(
+        template, func(request, **params), request=request
+    )
+
+
+def include(request, name, params):
+    """Метка фрагмента при сборке каркаса, иначе сам фрагмент."""
+    if request is None:
+        # Страница без запроса (например, 500): пользователя нет.
+        return mark_safe(render_to_string(_fragments[name][0], params))
+    if getattr(request, 'esi_deferred', False):
+        return mark_safe(f'<!--esi {name} {urlencode(params)}-->')
+    return mark_safe(render_fragment(request, name, params))
+
+
+def assemble(request, content, keep_shared=False):
+    """Подставляет в каркас фрагменты текущего пользователя; с
+    `keep_shared=True` метки общих фрагментов остаются на месте."""
+    def replace(match):
+        if keep_shared and match[1] in _shared:
+            return match[0]
+        return render_fragment(request, match[1], dict(parse_qsl(match[2])))
+    return MARKER.sub(replace, content)
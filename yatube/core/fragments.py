@@ -0,0 +1,6 @@
+from .esi import fragment
+
+
+@fragment('user_nav', 'includes/user_nav.html')
+def user_nav(request):
+    return {}
@@ -0,0 +1,78 @@
+import statistics
+import threading
+import time
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время ответа страниц и число открытых соединений с БД. '
+        'Для сравнения настроек запустите дважды с разными DB_*.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='*', default=['/'])
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--threads', type=int, default=4)
+
+    def handle(self, *args, urls, requests, threads, **options):
+        opened = []
+        timings = []
+        lock = threading.Lock()
+
+        def count_connection(sender, connection, **kwargs):
+            if not getattr(connection, 'connection_reused', False):
+                with lock:
+                    opened.append(connection.alias)
+
+        # Запросы идут через обычный WSGI-обработчик: тестовый Client
+        # отключает закрытие соединений в конце запроса. Адрес вне
+        # INTERNAL_IPS, чтобы не включалась debug-панель.
+        handler = WSGIHandler()
+        factory = RequestFactory(REMOTE_ADDR='192.0.2.1')
+
+        def worker(count):
+            for i in range(count):
+                environ = factory.get(urls[i % len(urls)]).environ
+                started = time.perf_counter()
+                b''.join(handler(environ, lambda *args: None))
+                elapsed = time.perf_counter() - started
+                with lock:
+                    timings.append(elapsed)
+            connections.close_all()
+
+        connection_created.connect(count_connection)
+        workers = [
+            threading.Thread(target=worker, args=(requests // threads,))
+            for _ in range(threads)
+        ]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        total = time.perf_counter() - started
+        connection_created.disconnect(count_connection)
+
+        timings.sort()
+        settings_dict = connections['default'].settings_dict
+        self.stdout.write(
+            f"{settings_dict['ENGINE']}: "
+            f"CONN_MAX_AGE={settings_dict['CONN_MAX_AGE']}, "
+            f"POOL_SIZE={settings_dict.get('POOL_SIZE', 0)}, "
+            f"PRAGMAS={'on' if settings_dict.get('PRAGMAS') else 'off'}"
+        )
+        self.stdout.write(
+            f'Запросов: {len(timings)} за {total:.2f} с '
+            f'({len(timings) / total:.0f} в секунду)'
+        )
+        self.stdout.write(
+            f'p50: {statistics.median(timings) * 1000:.1f} мс, '
+            f'p95: {timings[int(len(timings) * 0.95)] * 1000:.1f} мс'
+        )
+        self.stdout.write(f'Новых соединений с БД: {len(opened)}')
@@ -0,0 +1,219 @@
+"""Метрики запросов в формате Prometheus.
+
+`MetricsMiddleware` для доли запросов `METRICS_SAMPLE_RATE` замеряет
+время ответа, число и время SQL-запросов, время рендера шаблонов,
+события кеша страниц и размер ответа. Значения складываются в
+гистограммы по имени URL (`posts:index`) в памяти процесса и отдаются
+view `metrics` текстом, который читает Prometheus. Замеряются только
+view из пространств имён `METRICS_NAMESPACES`, чтобы число рядов не
+росло от случайных адресов.
+"""
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template import base
+
+TIME_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+SIZE_BUCKETS = (
+    1024, 4096, 16384, 65536, 262144, 1048576, 4194304,
+)
+
+# Гистограммы: имя -> (описание, границы корзин).
+HISTOGRAMS = {
+    'request_duration_seconds': ('Время ответа', TIME_BUCKETS),
+    'request_sql_queries': ('Число SQL-запросов', COUNT_BUCKETS),
+    'request_sql_duration_seconds': ('Время SQL-запросов', TIME_BUCKETS),
+    'request_template_duration_seconds': (
+        'Время рендера шаблонов', TIME_BUCKETS
+    ),
+    'response_size_bytes': ('Размер ответа', SIZE_BUCKETS),
+}
+PREFIX = 'yatube_'
+
+_state = threading.local()
+_lock = threading.Lock()
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def cumulative(self):
+        """Пары (граница, число значений не больше неё), включая +Inf."""
+        total = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            total += count
+            yield bound, total
+
+
+def _view_histograms():
+    return {
+        name: Histogram(buckets) for name, (_, buckets) in HISTOGRAMS.items()
+    }
+
+
+_histograms = defaultdict(_view_histograms)
+_cache_events = Counter()
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _cache_events.clear()
+
+
+class RequestMetrics:
+    """Замеры одного запроса; наполняются обёртками SQL и шаблонов."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.cache_events = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+def current():
+    return getattr(_state, 'metrics', None)
+
+
+def count_cache(event):
+    """Учитывает событие кеша страниц в замеряемом запросе."""
+    metrics = current()
+    if metrics is not None:
+        metrics.cache_events[event] += 1
+
+
+def _timed_render(render):
+    def wrapper(self, context):
+        metrics = current()
+        # Вложенные шаблоны ({% include %}) уже входят во время внешнего.
+        if metrics is None or metrics.template_depth:
+            return render(self, context)
+        metrics.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            metrics.template_seconds += time.perf_counter() - started
+            metrics.template_depth -= 1
+    wrapper.timed = True
+    return wrapper
+
+
+def instrument_templates():
+    if not getattr(base.Template.render, 'timed', False):
+        base.Template.render = _timed_render(base.Template.render)
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.url_name:
+        return None
+    if match.namespace not in settings.METRICS_NAMESPACES:
+        return None
+    return match.view_name
+
+
+def record(view, metrics, elapsed, size):
+    with _lock:
+        histograms = _histograms[view]
+        histograms['request_duration_seconds'].observe(elapsed)
+        histograms['request_sql_queries'].observe(metrics.queries)
+        histograms['request_sql_duration_seconds'].observe(
+            metrics.sql_seconds
+        )
+        histograms['request_template_duration_seconds'].observe(
+            metrics.template_seconds
+        )
+        if size is not None:
+            histograms['response_size_bytes'].observe(size)
+        for event, count in metrics.cache_events.items():
+            _cache_events[view, event] += count
+
+
+class MetricsMiddleware:
+    """Замеряет выборку запросов; ставится первым в MIDDLEWARE."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.METRICS_SAMPLE_RATE
+        if rate <= 0 or random.random() >= rate:
+            return self.get_response(request)
+        metrics = _state.metrics = RequestMetrics()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _state.metrics = None
+        elapsed = time.perf_counter() - started
+        view = _view_name(request)
+        if view is not None:
+            size = None if response.streaming else len(response.content)
+            record(view, metrics, elapsed, size)
+        return response
+
+
+def _labels(**labels):
+    return ','.join(
+        f'{name}="{value}"' for name, value in sorted(labels.items())
+    )
+
+
+def exposition():
+    """Метрики процесса в текстовом формате Prometheus."""
+    lines = [
+        f'# HELP {PREFIX}metrics_sample_rate Доля замеряемых запросов',
+        f'# TYPE {PREFIX}metrics_sample_rate gauge',
+        f'{PREFIX}metrics_sample_rate {settings.METRICS_SAMPLE_RATE}',
+    ]
+    with _lock:
+        for name, (description, _) in HISTOGRAMS.items():
+            metric = PREFIX + name
+            lines.append(f'# HELP {metric} {description}')
+            lines.append(f'# TYPE {metric} histogram')
+            for view in sorted(_histograms):
+                histogram = _histograms[view][name]
+                for bound, count in histogram.cumulative():
+                    labels = _labels(view=view, le=bound)
+                    lines.append(f'{metric}_bucket{{{labels}}} {count}')
+                labels = _labels(view=view)
+                lines.append(f'{metric}_sum{{{labels}}} {histogram.sum}')
+                lines.append(
+                    f'{metric}_count{{{labels}}} {sum(histogram.counts)}'
+                )
+        metric = f'{PREFIX}page_cache_events_total'
+        lines.append(f'# HELP {metric} События кеша страниц')
+        lines.append(f'# TYPE {metric} counter')
+        for (view, event), count in sorted(_cache_events.items()):
+            labels = _labels(view=view, event=event)
+            lines.append(f'{metric}{{{labels}}} {count}')
+    return '\n'.join(lines) + '\n'
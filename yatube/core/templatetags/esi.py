@@ -0,0 +1,11 @@
+from django import template
+
+from core import esi as fragments
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def esi(context, name, **params):
+    """Персональный фрагмент: `{% esi 'follow_button' author=... %}`."""
+    return fragments.include(context.get('request'), name, params)
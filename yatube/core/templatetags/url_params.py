@@ -0,0 +1,19 @@
+from django import template
+
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def url_replace(context, **kwargs):
+    """Строка запроса текущей страницы с заменёнными параметрами.
+
+    Пустое значение убирает параметр, остальные параметры сохраняются.
+    """
+    query = context['request'].GET.copy()
+    for key, value in kwargs.items():
+        if value in (None, ''):
+            query.pop(key, None)
+        else:
+            query[key] = value
+    return f'?{query.urlencode()}'
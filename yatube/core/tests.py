@@ -0,0 +1,355 @@
+import os
+import sqlite3
+import tempfile
+import time
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.template import RequestContext, Template
+from django.test import (
+    Client, SimpleTestCase, TestCase, RequestFactory, override_settings,
+)
+from django.urls import reverse
+
+from posts.models import Post, User
+from . import cache as page_cache
+from . import db_router
+from . import metrics
+from .db_backends import mixins
+from .db_backends.sqlite3.base import DatabaseWrapper
+
+
+class ShellCachePageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Test_Shell_User')
+        cls.other = User.objects.create_user(username='Test_Shell_Other')
+
+    def setUp(self):
+        cache.clear()
+        page_cache.reset_stats()
+        self.factory = RequestFactory()
+        self.calls = 0
+        self.template = Template(
+            "{% load esi %}render {{ calls }} {% esi 'user_nav' %}"
+        )
+
+    def make_view(self, **options):
+        @page_cache.shell_cache_page(
+            60, tags=lambda request: ['shell_tests'], **options
+        )
+        def view(request):
+            self.calls += 1
+            return HttpResponse(self.template.render(
+                RequestContext(request, {'calls': self.calls})
+            ))
+        return view
+
+    def get(self, view, user=None):
+        request = self.factory.get('/')
+        request.user = user or AnonymousUser()
+        return view(request)
+
+    def test_shell_shared_with_personal_fragments(self):
+        """Каркас общий, а меню пользователя подставляется при отдаче."""
+        view = self.make_view()
+        anonymous = self.get(view)
+        response = self.get(view, self.user)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertContains(anonymous, 'Войти')
+        self.assertNotContains(anonymous, '<!--esi')
+        self.assertContains(response, 'Пользователь: Test_Shell_User')
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_invalidate_drops_tagged_pages(self):
+        """Сброс тега пересобирает страницы с ним."""
+        view = self.make_view()
+        self.get(view)
+        page_cache.invalidate('other_tag')
+        self.assertEqual(self.get(view)['X-Cache'], 'HIT')
+        page_cache.invalidate('shell_tests')
+        response = self.get(view)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertContains(response, 'render 2')
+
+    def test_evicted_tag_resets_pages(self):
+        """Вытесненная версия тега создаётся заново и сбрасывает страницы."""
+        view = self.make_view()
+        self.get(view)
+        cache.delete(page_cache._tag_key('shell_tests'))
+        self.assertEqual(self.get(view)['X-Cache'], 'MISS')
+
+    def test_single_flight_serves_stale_while_locked(self):
+        """Пока один воркер пересобирает страницу, остальным отдаётся копия."""
+        view = self.make_view()
+        self.get(view)
+        with mock.patch.object(
+            page_cache, 'should_recompute', return_value=True
+        ):
+            with mock.patch.object(cache, 'add', return_value=False):
+                response = self.get(view)
+            self.assertEqual(response['X-Cache'], 'STALE')
+            self.assertEqual(self.calls, 1)
+            response = self.get(view)
+        self.assertEqual(self.calls, 2)
+        self.assertContains(response, 'render 2')
+        self.assertEqual(page_cache.stats()[page_cache.REGENERATION], 1)
+
+    def test_xfetch_recomputes_only_near_expiry(self):
+        """Досрочная пересборка срабатывает только у самого истечения."""
+        now = time.time()
+        self.assertFalse(
+            page_cache.should_recompute(now + 3600, 0.01, beta=1, now=now)
+        )
+        self.assertTrue(
+            page_cache.should_recompute(now - 1, 0.01, beta=1, now=now)
+        )
+
+    def test_per_user_shells(self):
+        """С per_user каркас у каждого пользователя свой."""
+        view = self.make_view(per_user=True)
+        self.get(view, self.user)
+        self.assertEqual(self.get(view, self.other)['X-Cache'], 'MISS')
+        self.assertEqual(self.get(view, self.user)['X-Cache'], 'HIT')
+        self.assertEqual(self.calls, 2)
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Test_Metrics_User')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    @override_settings(METRICS_TOKEN='test-token')
+    def scrape(self):
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer test-token'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_request_measured_by_url_name(self):
+        """Запрос попадает в гистограммы своего имени URL."""
+        self.client.get(reverse('posts:post_detail', args=(self.post.pk,)))
+        self.client.get(reverse('posts:post_detail', args=(self.post.pk,)))
+        text = self.scrape()
+        for metric in metrics.HISTOGRAMS:
+            self.assertIn(
+                f'yatube_{metric}_count{{view="posts:post_detail"}} 2', text
+            )
+        self.assertIn(
+            'yatube_page_cache_events_total'
+            '{event="hit",view="posts:post_detail"} 1', text
+        )
+        self.assertNotIn('view="metrics"', text)
+
+    def test_counts_sql_and_templates(self):
+        """В замер входят SQL-запросы и время рендера шаблонов."""
+        self.client.get(reverse('posts:index'))
+        histograms = metrics._histograms['posts:index']
+        self.assertGreater(histograms['request_sql_queries'].sum, 0)
+        self.assertGreater(
+            histograms['request_template_duration_seconds'].sum, 0
+        )
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_sampling_off(self):
+        """При нулевой доле запросы не замеряются."""
+        self.client.get(reverse('posts:index'))
+        self.assertNotIn('posts:index', self.scrape())
+
+    @override_settings(METRICS_TOKEN='test-token')
+    def test_endpoint_needs_token_or_staff(self):
+        """Адрес клиента доступа не даёт: нужен токен или персонал."""
+        url = reverse('metrics')
+        for headers in (
+            {'REMOTE_ADDR': '127.0.0.1'},
+            {'HTTP_AUTHORIZATION': 'Bearer wrong-token'},
+        ):
+            with self.subTest(headers=headers):
+                response = self.client.get(url, **headers)
+                self.assertEqual(response.status_code, 404)
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_endpoint_closed_without_token(self):
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer '
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class SQLiteBackendTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.addCleanup(mixins._pools.clear)
+        self.wrapper = DatabaseWrapper({
+            **connection.settings_dict,
+            'NAME': os.path.join(directory.name, 'db.sqlite3'),
+            'CONN_HEALTH_CHECKS': True,
+            'POOL_SIZE': 2,
+            'PRAGMAS': {'journal_mode': 'WAL', 'synchronous': 'NORMAL'},
+            'TRANSACTION_MODE': 'IMMEDIATE',
+        }, alias='backend_tests')
+        self.addCleanup(self.wrapper.close)
+
+    def query(self, sql):
+        with self.wrapper.cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied(self):
+        """Новое соединение настраивается прагмами из настроек."""
+        self.assertEqual(self.query('PRAGMA journal_mode'), 'wal')
+        self.assertEqual(self.query('PRAGMA synchronous'), 1)
+
+    def test_transaction_takes_write_lock(self):
+        """Транзакция сразу блокирует запись другим соединениям."""
+        self.wrapper.set_autocommit(False)
+        self.wrapper._start_transaction_under_autocommit()
+        self.addCleanup(self.wrapper.rollback)
+        other = sqlite3.connect(self.wrapper.settings_dict['NAME'], timeout=0)
+        self.addCleanup(other.close)
+        with self.assertRaises(sqlite3.OperationalError):
+            other.execute('BEGIN IMMEDIATE')
+
+    def test_closed_connection_returns_to_pool(self):
+        """Закрытое соединение переиспользуется следующим запросом."""
+        self.wrapper.ensure_connection()
+        raw = self.wrapper.connection
+        self.wrapper.close()
+        self.wrapper.ensure_connection()
+        self.assertIs(self.wrapper.connection, raw)
+        self.assertTrue(self.wrapper.connection_reused)
+
+    def test_dead_pooled_connection_discarded(self):
+        """Неживое соединение из пула заменяется новым."""
+        self.wrapper.ensure_connection()
+        raw = self.wrapper.connection
+        self.wrapper.close()
+        raw.close()
+        self.wrapper.ensure_connection()
+        self.assertIsNot(self.wrapper.connection, raw)
+        self.assertFalse(self.wrapper.connection_reused)
+
+    def test_health_check_before_reuse(self):
+        """Сохранённое соединение проверяется в начале запроса."""
+        self.wrapper.ensure_connection()
+        raw = self.wrapper.connection
+        self.wrapper.close_if_unusable_or_obsolete()
+        with mock.patch.object(self.wrapper, 'is_usable', return_value=False):
+            self.wrapper.ensure_connection()
+        self.assertIsNot(self.wrapper.connection, raw)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTests(SimpleTestCase):
+    def test_replica_only_inside_marked_reads(self):
+        """На реплику уходят только чтения моделей из списка приложений."""
+        router = db_router.ReplicaRouter()
+        self.assertEqual(router.db_for_read(Post), 'default')
+        with db_router.replica_reads():
+            self.assertEqual(router.db_for_read(Post), 'replica1')
+            self.assertEqual(router.db_for_read(Session), 'default')
+            self.assertEqual(router.db_for_read(User), 'default')
+            self.assertEqual(router.db_for_write(Post), 'default')
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Test_Replica_User')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.reads = []
+
+        # Реплики в тестах нет: запоминаем решение и читаем из default.
+        def db_for_read(router, model, **hints):
+            # Служебная модель кеша в БД не зарегистрирована в приложениях.
+            label = f'{model._meta.app_label}.{model._meta.object_name}'
+            self.reads.append((label, db_router.reading_from_replica()))
+            return db_router.PRIMARY
+
+        patcher = mock.patch.object(
+            db_router.ReplicaRouter, 'db_for_read', db_for_read
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_marked_view_reads_from_replica(self):
+        """Страница поста читается с реплики."""
+        self.client.get(reverse('posts:post_detail', args=(self.post.pk,)))
+        self.assertIn(('posts.Post', True), self.reads)
+
+    def test_writer_pinned_to_primary(self):
+        """После комментария автор читает с основной БД."""
+        response = self.client.post(
+            reverse('posts:add_comment', args=(self.post.pk,)),
+            {'text': 'Тестовый комментарий'},
+        )
+        self.assertIn(db_router.PIN_COOKIE, response.cookies)
+        self.reads.clear()
+        self.client.get(reverse('posts:post_detail', args=(self.post.pk,)))
+        self.assertTrue(self.reads)
+        self.assertFalse(any(replica for _, replica in self.reads))
+
+
+@override_settings(DATABASE_REPLICAS=['lagging'])
+class LaggingReplicaTests(TestCase):
+    """Реплика `lagging` отстаёт: всё, что на неё направлено, читается
+    как до последних записей."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='Test_Lagging_User', password='old-Password-1'
+        )
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.on_replica = []
+        route = db_router.ReplicaRouter.db_for_read
+
+        def db_for_read(router, model, **hints):
+            alias = route(router, model, **hints)
+            if alias == 'lagging':
+                self.on_replica.append(model._meta.label)
+            return db_router.PRIMARY
+
+        patcher = mock.patch.object(
+            db_router.ReplicaRouter, 'db_for_read', db_for_read
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_password_change_keeps_session(self):
+        """Пользователь и сессия не читаются с реплики: после смены
+        пароля (без закрепления за основной БД) вход не слетает."""
+        response = self.client.post(reverse('users:password_change_form'), {
+            'old_password': 'old-Password-1',
+            'new_password1': 'new-Password-2',
+            'new_password2': 'new-Password-2',
+        })
+        self.assertEqual(response.status_code, 302)
+        response = self.client.get(reverse('posts:index'))
+        self.assertTrue(response.wsgi_request.user.is_authenticated)
+        self.assertTrue(self.on_replica)
+        self.assertNotIn('auth.User', self.on_replica)
+        self.assertNotIn('sessions.Session', self.on_replica)
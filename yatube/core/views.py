@@ -1,6 +1,12 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 from http import HTTPStatus
 
+from . import metrics as request_metrics
+
 
 def page_not_found(request, exception):
     return render(
@@ -33,3 +39,25 @@ def csrf_failure(request, reason=''):
         'core/403csrf.html',
         status=HTTPStatus.FORBIDDEN
     )
+
+
+def metrics_allowed(request):
+    """Персонал или запрос с `Authorization: Bearer <METRICS_TOKEN>`."""
+    if request.user.is_staff:
+        return True
+    token = settings.METRICS_TOKEN
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    # Адресу клиента не доверяем: за обратным прокси он всегда локальный.
+    return bool(token) and hmac.compare_digest(
+        header.encode(), f'Bearer {token}'.encode()
+    )
+
+
+def metrics(request):
+    """Метрики процесса для Prometheus, только для `metrics_allowed`."""
+    if not metrics_allowed(request):
+        raise Http404
+    return HttpResponse(
+        request_metrics.exposition(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
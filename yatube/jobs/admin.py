@@ -0,0 +1,22 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'name', 'status', 'priority', 'attempts', 'run_at', 'locked_by'
+    )
+    list_filter = ('status', 'name')
+    actions = ('retry',)
+
+    def retry(self, request, queryset):
+        queryset.update(
+            status=Job.QUEUED, attempts=0, run_at=timezone.now(),
+            locked_by='', locked_at=None,
+        )
+    retry.short_description = 'Повторить выбранные задачи'
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,35 @@
+"""Отправка писем через очередь задач.
+
+`QueuedEmailBackend` ставит каждое письмо в очередь, а задача
+`send_email` отправляет его бэкендом из `JOBS_EMAIL_BACKEND`, так что
+сброс пароля не ждёт почтовый сервер. Вложения не поддерживаются.
+"""
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .queue import PRIORITY_HIGH, enqueue, task
+
+FIELDS = ('subject', 'body', 'from_email', 'to', 'cc', 'bcc', 'reply_to')
+
+
+def serialize(message):
+    data = {field: getattr(message, field) for field in FIELDS}
+    data['headers'] = message.extra_headers
+    data['alternatives'] = getattr(message, 'alternatives', [])
+    return data
+
+
+@task(priority=PRIORITY_HIGH)
+def send_email(data):
+    message = EmailMultiAlternatives(
+        connection=get_connection(settings.JOBS_EMAIL_BACKEND), **data
+    )
+    message.send()
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            enqueue(send_email, serialize(message))
+        return len(email_messages)
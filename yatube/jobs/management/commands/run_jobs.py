@@ -0,0 +1,40 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs import queue
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает воркеры очереди задач. С --burst выходит, когда '
+        'очередь опустеет.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=settings.JOBS_WORKERS,
+            help='Число процессов-воркеров (1 — в текущем процессе)',
+        )
+        parser.add_argument('--burst', action='store_true')
+
+    def handle(self, *args, processes, burst, **options):
+        if processes <= 1:
+            processed = queue.work(burst=burst)
+        else:
+            # Соединения с БД не должны переходить в дочерние процессы.
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=processes, initializer=django.setup
+            ) as executor:
+                futures = [
+                    executor.submit(queue.work, burst)
+                    for _ in range(processes)
+                ]
+                processed = sum(future.result() for future in futures)
+        self.stdout.write(self.style.SUCCESS(
+            f'Выполнено задач: {processed}'
+        ))
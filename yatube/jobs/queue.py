@@ -0,0 +1,170 @@
+"""Очередь отложенных задач в таблице БД.
+
+Задача — импортируемая функция с JSON-сериализуемыми аргументами,
+помеченная декоратором `task`. `enqueue` записывает её в таблицу `Job`
+в той же транзакции, что и вызвавшие её изменения: воркер увидит задачу
+только после коммита, а при откате её не будет вовсе.
+
+Воркеры (`manage.py run_jobs`) забирают задачи по приоритету, атомарно
+переводя строку из `queued` в `running`. Упавшая задача возвращается в
+очередь с экспоненциальной задержкой, после `max_attempts` попыток
+остаётся со статусом `failed`. Выполненные задачи удаляются.
+
+С `JOBS_EAGER` задачи выполняются сразу при постановке (разработка,
+тесты): так же в своей транзакции, ошибка пишется в лог.
+"""
+import json
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+PRIORITY_HIGH = 10
+PRIORITY_DEFAULT = 0
+PRIORITY_LOW = -10
+
+CLAIM_CANDIDATES = 10
+
+logger = logging.getLogger(__name__)
+
+
+def task(priority=PRIORITY_DEFAULT, max_attempts=None):
+    """Помечает функцию как задачу очереди с параметрами по умолчанию."""
+    def decorator(func):
+        func.job_name = f'{func.__module__}.{func.__qualname__}'
+        func.job_priority = priority
+        func.job_max_attempts = max_attempts
+        return func
+    return decorator
+
+
+def enqueue(func, *args, priority=None, delay=None):
+    """Ставит задачу в очередь (или выполняет её сразу с JOBS_EAGER)."""
+    name = getattr(func, 'job_name', None)
+    if name is None:
+        raise ValueError(f'{func!r} не помечена декоратором task')
+    payload = json.dumps(args)
+    if settings.JOBS_EAGER:
+        try:
+            _call(name, payload)
+        except Exception:
+            logger.exception('Задача %s упала', name)
+        return None
+    if priority is None:
+        priority = func.job_priority
+    return Job.objects.create(
+        name=name,
+        args=payload,
+        priority=priority,
+        max_attempts=func.job_max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        run_at=timezone.now() + (delay or timedelta()),
+    )
+
+
+def _call(name, args):
+    func = import_string(name)
+    with transaction.atomic():
+        func(*json.loads(args))
+
+
+def backoff(attempts):
+    """Задержка перед повтором: экспоненциальная, с потолком и разбросом."""
+    delay = min(
+        settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.JOBS_RETRY_MAX_DELAY,
+    )
+    return timedelta(seconds=delay * random.uniform(0.5, 1))
+
+
+def claim(worker_id):
+    """Забирает самую приоритетную готовую задачу или возвращает None.
+
+    Строка переводится в `running` условным UPDATE, поэтому задачу
+    получает ровно один из воркеров, выбравших одних и тех же кандидатов.
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(
+        status=Job.QUEUED, run_at__lte=now
+    ).order_by('-priority', 'run_at').values_list('pk', flat=True)
+    for pk in candidates[:CLAIM_CANDIDATES]:
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def execute(job):
+    """Выполняет задачу в транзакции и обновляет её строку по итогу."""
+    try:
+        _call(job.name, job.args)
+    except Exception:
+        logger.exception('Задача %s #%s упала', job.name, job.pk)
+        job.last_error = traceback.format_exc()
+        job.locked_by, job.locked_at = '', None
+        if job.attempts < job.max_attempts:
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + backoff(job.attempts)
+        else:
+            job.status = Job.FAILED
+        job.save(update_fields=(
+            'status', 'run_at', 'last_error', 'locked_by', 'locked_at'
+        ))
+        return False
+    job.delete()
+    return True
+
+
+def release_stale():
+    """Возвращает в очередь задачи воркеров, умерших посреди работы.
+
+    Задача, исчерпавшая попытки, помечается `failed`: иначе задача,
+    которая роняет сам воркер, перезапускалась бы бесконечно.
+    """
+    deadline = timezone.now() - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=deadline)
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED,
+        locked_by='',
+        locked_at=None,
+        last_error='Воркер не завершил задачу за JOBS_LOCK_TIMEOUT',
+    )
+    return stale.update(status=Job.QUEUED, locked_by='', locked_at=None)
+
+
+def run_next(worker_id):
+    job = claim(worker_id)
+    if job is None:
+        return False
+    execute(job)
+    return True
+
+
+def work(burst=False):
+    """Цикл воркера; с `burst` завершается, когда очередь опустела."""
+    worker_id = f'{socket.gethostname()}:{os.getpid()}'
+    processed = 0
+    while True:
+        close_old_connections()
+        release_stale()
+        while run_next(worker_id):
+            processed += 1
+            close_old_connections()
+        if burst:
+            return processed
+        time.sleep(settings.JOBS_POLL_INTERVAL)
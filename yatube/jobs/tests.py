@@ -0,0 +1,100 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import queue
+from .mail import QueuedEmailBackend
+from .models import Job
+
+calls = []
+
+
+@queue.task()
+def record(value):
+    calls.append(value)
+
+
+@queue.task(max_attempts=2)
+def explode():
+    raise RuntimeError('boom')
+
+
+@override_settings(JOBS_EAGER=False)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_jobs_run_by_priority(self):
+        """Воркер выполняет задачи по приоритету и удаляет выполненные."""
+        queue.enqueue(record, 'low', priority=queue.PRIORITY_LOW)
+        queue.enqueue(record, 'high', priority=queue.PRIORITY_HIGH)
+        queue.enqueue(record, 'default')
+        queue.work(burst=True)
+        self.assertEqual(calls, ['high', 'default', 'low'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_failed_job_retried_with_backoff(self):
+        """Упавшая задача откладывается, после всех попыток — failed."""
+        job = queue.enqueue(explode)
+        queue.run_next('test')
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('boom', job.last_error)
+        self.assertFalse(queue.run_next('test'))
+        Job.objects.update(run_at=timezone.now())
+        queue.run_next('test')
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_backoff_grows(self):
+        with mock.patch('random.uniform', return_value=1):
+            self.assertEqual(queue.backoff(1), timedelta(seconds=10))
+            self.assertEqual(queue.backoff(3), timedelta(seconds=40))
+
+    def test_stale_job_released(self):
+        """Задача умершего воркера возвращается в очередь."""
+        job = queue.enqueue(record, 'lost')
+        Job.objects.update(
+            status=Job.RUNNING,
+            locked_at=timezone.now() - timedelta(days=1),
+        )
+        call_command('run_jobs', processes=1, burst=True, stdout=mock.Mock())
+        self.assertEqual(calls, ['lost'])
+        self.assertFalse(Job.objects.filter(pk=job.pk).exists())
+
+    def test_stale_job_fails_after_last_attempt(self):
+        """Зависшая задача без оставшихся попыток не перезапускается."""
+        job = queue.enqueue(record, 'lost')
+        Job.objects.update(
+            status=Job.RUNNING,
+            attempts=F('max_attempts'),
+            locked_at=timezone.now() - timedelta(days=1),
+        )
+        self.assertEqual(queue.release_stale(), 0)
+        self.assertFalse(queue.run_next('test'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIsNone(job.locked_at)
+        self.assertIn('JOBS_LOCK_TIMEOUT', job.last_error)
+
+    @override_settings(
+        JOBS_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'
+    )
+    def test_email_sent_by_worker(self):
+        """Письмо уходит только при выполнении задачи."""
+        message = mail.EmailMessage(
+            'Тема', 'Текст', 'from@yatube.ru', ['to@yatube.ru'],
+            connection=QueuedEmailBackend(),
+        )
+        message.send()
+        self.assertEqual(len(mail.outbox), 0)
+        queue.work(burst=True)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['to@yatube.ru'])
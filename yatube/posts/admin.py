@@ -1,9 +1,12 @@
 from django.contrib import admin
-from .models import Post, Group, Comment, Follow
+from .models import Post, Group, Comment, Follow, TrendingPost, UserStats
 
 
 class PostAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'text', 'pub_date', 'author', 'group')
+    list_display = (
+        'pk', 'text', 'pub_date', 'author', 'group', 'comments_count',
+        'views_count',
+    )
     search_fields = ('text',)
     list_filter = ('pub_date',)
     list_editable = ('group',)
@@ -24,12 +27,28 @@ class CommentAdmin(admin.ModelAdmin):
 
 
 class FollowAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'user', 'author')
+    list_display = ('pk', 'user', 'author', 'created')
     search_fields = ('user',)
     empty_value_display = '-пусто-'
 
 
+class UserStatsAdmin(admin.ModelAdmin):
+    list_display = (
+        'user', 'posts_count', 'followers_count', 'following_count'
+    )
+    search_fields = ('user__username',)
+    readonly_fields = ('posts_count', 'followers_count', 'following_count')
+
+
+class TrendingPostAdmin(admin.ModelAdmin):
+    list_display = ('rank', 'post', 'score')
+    list_select_related = ('post',)
+    readonly_fields = ('post', 'rank', 'score')
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(UserStats, UserStatsAdmin)
+admin.site.register(TrendingPost, TrendingPostAdmin)
@@ -1,5 +1,18 @@
+import atexit
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from django.core.signals import request_finished
+
+        from . import fragments, signals, view_counts  # noqa: F401
+        request_finished.connect(view_counts.flush_if_due)
+        if settings.VIEWS_FLUSH_AT_EXIT:
+            # Простаивающий воркер не дождётся запроса, который сбросит
+            # его буфер: досбрасываем при штатной остановке процесса.
+            atexit.register(view_counts.flush)
@@ -0,0 +1,237 @@
+"""Замеры производительности страниц постов.
+
+Каждый сценарий — запрос к одной view через тестовый клиент. Для него
+считаются p50/p95 времени ответа, число SQL-запросов и их суммарное
+время, а также пик памяти, выделенной за один запрос (по `tracemalloc`,
+отдельным прогоном, чтобы трассировка не замедляла замер времени).
+Результаты сравниваются с базовыми
+из JSON-файла: время и память — с допуском `threshold`, число запросов —
+точно, так как оно не зависит от машины.
+
+Записывающие сценарии выполняются в транзакции, которая откатывается,
+чтобы набор данных не менялся между прогонами.
+"""
+import platform
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import NamedTuple
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from .models import Group, Post, UserStats
+
+SCALES = {
+    '10k': {
+        'users': 1000, 'groups': 20, 'posts': 10_000,
+        'comments': 20_000, 'follows': 10_000,
+    },
+    '100k': {
+        'users': 10_000, 'groups': 50, 'posts': 100_000,
+        'comments': 200_000, 'follows': 100_000,
+    },
+    '1m': {
+        'users': 100_000, 'groups': 200, 'posts': 1_000_000,
+        'comments': 2_000_000, 'follows': 1_000_000,
+    },
+}
+
+# Метрики, сравниваемые с допуском, и метрики, сравниваемые точно.
+TIMED_METRICS = ('p50_ms', 'p95_ms', 'sql_ms', 'peak_mem_mb')
+EXACT_METRICS = ('queries',)
+
+
+class Scenario(NamedTuple):
+    method: str
+    url: str
+    data: dict = None
+    login: bool = False
+    writes: bool = False
+
+
+def prepare(scale, seed=0, stdout=None):
+    """Догенерирует данные до размера `scale`, если их меньше."""
+    sizes = SCALES[scale]
+    if Post.objects.count() >= sizes['posts']:
+        return False
+    call_command(
+        'generate_data', seed=seed, prefix='bench', stdout=stdout, **sizes
+    )
+    return True
+
+
+def targets():
+    """Самые тяжёлые объекты набора: у них больше всего постов и связей."""
+    group = Group.objects.annotate(
+        total=Count('posts')
+    ).order_by('-total').first()
+    author = UserStats.objects.select_related('user').order_by(
+        '-posts_count'
+    ).first().user
+    reader = UserStats.objects.select_related('user').order_by(
+        '-following_count'
+    ).first().user
+    post = Post.objects.order_by('-comments_count', '-pk').first()
+    return {'group': group, 'author': author, 'reader': reader, 'post': post}
+
+
+def scenarios(objects):
+    post = objects['post'].pk
+    result = {
+        'index': Scenario('get', reverse('posts:index')),
+        'profile': Scenario('get', reverse(
+            'posts:profile', args=(objects['author'].username,)
+        )),
+        'post_detail': Scenario(
+            'get', reverse('posts:post_detail', args=(post,))
+        ),
+        'follow_index': Scenario(
+            'get', reverse('posts:follow_index'), login=True
+        ),
+        'post_create': Scenario(
+            'post', reverse('posts:post_create'),
+            {'text': 'Пост из замера'}, login=True, writes=True,
+        ),
+        'add_comment': Scenario(
+            'post', reverse('posts:add_comment', args=(post,)),
+            {'text': 'Комментарий из замера'}, login=True, writes=True,
+        ),
+    }
+    if objects['group'] is not None:
+        result['group_posts'] = Scenario('get', reverse(
+            'posts:group_list', args=(objects['group'].slug,)
+        ))
+    return result
+
+
+@contextmanager
+def rolled_back(enabled):
+    if not enabled:
+        yield
+        return
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def peak_mem_mb(request, scenario):
+    """Пик памяти сверх уже занятой за один запрос сценария."""
+    # Пик RSS процесса не опускается, и после тяжёлого сценария все
+    # следующие показали бы его же.
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        with rolled_back(scenario.writes):
+            request(scenario.url, scenario.data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return (peak - before) / (1024 * 1024)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class QueryTimer:
+    """Считает SQL-запросы и их время независимо от DEBUG."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+def measure(client, scenario, iterations, warmup):
+    request = getattr(client, scenario.method)
+    timings, queries, sql_times = [], [], []
+    for i in range(warmup + iterations):
+        timer = QueryTimer()
+        with rolled_back(scenario.writes), connection.execute_wrapper(timer):
+            started = time.perf_counter()
+            response = request(scenario.url, scenario.data)
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise RuntimeError(
+                f'{scenario.url}: ответ {response.status_code}'
+            )
+        if i >= warmup:
+            timings.append(elapsed)
+            queries.append(timer.count)
+            sql_times.append(timer.seconds)
+    return {
+        'p50_ms': round(statistics.median(timings) * 1000, 2),
+        'p95_ms': round(percentile(timings, 0.95) * 1000, 2),
+        'queries': max(queries),
+        'sql_ms': round(statistics.median(sql_times) * 1000, 2),
+        'peak_mem_mb': round(peak_mem_mb(request, scenario), 1),
+    }
+
+
+def run(names=None, iterations=50, warmup=5, cache=False):
+    """Прогоняет сценарии и возвращает результаты по именам."""
+    objects = targets()
+    # Адрес вне INTERNAL_IPS, чтобы не включалась debug-панель.
+    anonymous = Client(REMOTE_ADDR='192.0.2.1')
+    reader = Client(REMOTE_ADDR='192.0.2.1')
+    reader.force_login(objects['reader'])
+    results = {}
+    # Без кеша страниц: попадания в него скрыли бы регрессии в самих view.
+    with override_settings(PAGE_CACHE_ENABLED=cache):
+        for name, scenario in scenarios(objects).items():
+            if names and name not in names:
+                continue
+            client = reader if scenario.login else anonymous
+            results[name] = measure(client, scenario, iterations, warmup)
+    return results
+
+
+def report(scale, results):
+    return {
+        'scale': scale,
+        'posts': Post.objects.count(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'database': connection.vendor,
+        'results': results,
+    }
+
+
+def compare(baseline, results, threshold):
+    """Список регрессий относительно базовых результатов."""
+    regressions = []
+    for name, metrics in results.items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            continue
+        for metric in TIMED_METRICS:
+            if metric in base and metrics[metric] > base[metric] * (
+                1 + threshold
+            ):
+                regressions.append(
+                    f'{name}.{metric}: {metrics[metric]} > {base[metric]} '
+                    f'(+{threshold:.0%})'
+                )
+        for metric in EXACT_METRICS:
+            if metric in base and metrics[metric] > base[metric]:
+                regressions.append(
+                    f'{name}.{metric}: {metrics[metric]} > {base[metric]}'
+                )
+    return regressions
@@ -0,0 +1,357 @@
+"""Массовая загрузка пользователей, групп, постов, комментариев и подписок.
+
+Записи вставляются `bulk_create` пачками, каждая пачка — отдельная
+транзакция, так что память не растёт с объёмом. `bulk_create` не шлёт
+сигналы, поэтому производные данные (счётчики, ленты подписок,
+поисковый индекс, кеш страниц) пересобираются один раз в конце
+(`rebuild_derived`). На время загрузки индексы из `Meta.indexes`
+удаляются и затем строятся заново; уникальные ограничения остаются —
+по ним `ignore_conflicts` отбрасывает дубли.
+
+Источник записей — генератор (`Generator`, воспроизводим по seed) или
+поток строк JSONL/CSV (`read_rows` и `import_*`).
+"""
+import csv
+import io
+import json
+import random
+import sys
+from array import array
+from bisect import bisect
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counters, feed
+from .models import Comment, Follow, Group, Post, TimelineEntry, User
+
+BATCH_SIZE = 5000
+
+# Модели, чьи индексы из Meta.indexes снимаются на время загрузки.
+INDEXED_MODELS = (Post, Comment, TimelineEntry)
+
+WORDS = (
+    'утро', 'город', 'море', 'книга', 'дорога', 'кофе', 'проект', 'друг',
+    'лето', 'музыка', 'фото', 'новость', 'вечер', 'идея', 'работа', 'кот',
+    'поезд', 'сад', 'код', 'осень', 'снег', 'горы', 'река', 'звезда',
+)
+FIRST_NAMES = ('Анна', 'Иван', 'Мария', 'Пётр', 'Ольга', 'Сергей', 'Елена')
+LAST_NAMES = ('Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Соколов', 'Лебедев')
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def insert(model, objects, batch_size=BATCH_SIZE):
+    """Вставляет объекты пачками; возвращает число вставленных строк."""
+    before = model.objects.count()
+    for batch in batches(objects, batch_size):
+        with transaction.atomic():
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+    return model.objects.count() - before
+
+
+@contextmanager
+def deferred_indexes(models=INDEXED_MODELS):
+    """Снимает индексы из `Meta.indexes` и строит их после загрузки."""
+    dropped = []
+    try:
+        with connection.schema_editor() as editor:
+            for model in models:
+                for index in model._meta.indexes:
+                    editor.remove_index(model, index)
+                    dropped.append((model, index))
+        yield
+    finally:
+        with connection.schema_editor() as editor:
+            for model, index in dropped:
+                editor.add_index(model, index)
+
+
+@contextmanager
+def explicit_dates():
+    """Отключает auto_now/auto_now_add, чтобы сохранить даты из источника."""
+    fields = (
+        Post._meta.get_field('pub_date'),
+        Post._meta.get_field('updated_at'),
+        Comment._meta.get_field('created'),
+        Follow._meta.get_field('created'),
+    )
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+@contextmanager
+def loading(defer_indexes=True):
+    """Окружение загрузки: даты из источника и, по желанию, без индексов."""
+    with explicit_dates():
+        if defer_indexes:
+            with deferred_indexes():
+                yield
+        else:
+            yield
+
+
+def rebuild_derived():
+    """Пересобирает всё, что при обычной записи поддерживают сигналы."""
+    counters.recount_users()
+    counters.recount_posts()
+    Comment.objects.fill_root_paths()
+    feed.rebuild_timelines()
+    call_command('rebuild_search_index', stdout=io.StringIO())
+    cache.clear()
+
+
+def reset_sequences(*models):
+    """Сдвигает автоинкремент после вставки записей с явными id."""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def pks(queryset):
+    """Первичные ключи запроса компактным массивом."""
+    return array('q', queryset.order_by('pk').values_list('pk', flat=True))
+
+
+class ZipfSampler:
+    """Выбор элемента с вероятностью, обратной степени его ранга.
+
+    Несколько элементов получают большую часть выборок (популярные
+    авторы, обсуждаемые посты), остальные — длинный хвост. Ранги
+    перемешаны, чтобы популярность не зависела от id.
+    """
+
+    def __init__(self, items, alpha, rng):
+        self.items = array('q', items)
+        rng.shuffle(self.items)
+        self.cumulative = array('d', accumulate(
+            1 / rank ** alpha for rank in range(1, len(self.items) + 1)
+        ))
+        self.rng = rng
+
+    def __call__(self):
+        point = self.rng.random() * self.cumulative[-1]
+        return self.items[bisect(self.cumulative, point)]
+
+
+class Generator:
+    """Синтетические записи, воспроизводимые по seed."""
+
+    def __init__(self, seed=0, alpha=1.2, days=365, prefix='load'):
+        self.rng = random.Random(seed)
+        self.alpha = alpha
+        self.days = days
+        self.prefix = prefix
+        self.now = timezone.now()
+
+    def text(self, low, high):
+        words = self.rng.choices(WORDS, k=self.rng.randint(low, high))
+        return ' '.join(words)
+
+    def date(self):
+        age = timedelta(days=self.days) * self.rng.random()
+        return self.now - age
+
+    def users(self, count):
+        password = make_password(None)
+        for i in range(count):
+            yield User(
+                username=f'{self.prefix}{i}',
+                first_name=self.rng.choice(FIRST_NAMES),
+                last_name=self.rng.choice(LAST_NAMES),
+                password=password,
+                date_joined=self.date(),
+            )
+
+    def groups(self, count):
+        for i in range(count):
+            yield Group(
+                title=f'Группа {self.prefix} {i}',
+                slug=f'{self.prefix}-group-{i}',
+                description=self.text(5, 20),
+            )
+
+    def posts(self, count, user_ids, group_ids):
+        author = ZipfSampler(user_ids, self.alpha, self.rng)
+        for _ in range(count):
+            pub_date = self.date()
+            yield Post(
+                author_id=author(),
+                group_id=(
+                    self.rng.choice(group_ids)
+                    if group_ids and self.rng.random() < 0.7 else None
+                ),
+                text=self.text(5, 60),
+                pub_date=pub_date,
+                updated_at=pub_date,
+            )
+
+    def comments(self, count, user_ids, post_ids):
+        post = ZipfSampler(post_ids, self.alpha, self.rng)
+        for _ in range(count):
+            yield Comment(
+                post_id=post(),
+                author_id=self.rng.choice(user_ids),
+                text=self.text(2, 20),
+                created=self.date(),
+            )
+
+    def follows(self, count, user_ids):
+        """Подписки со степенным распределением числа подписчиков."""
+        author = ZipfSampler(user_ids, self.alpha, self.rng)
+        for _ in range(count):
+            user_id, author_id = self.rng.choice(user_ids), author()
+            if user_id != author_id:
+                yield Follow(
+                    user_id=user_id, author_id=author_id, created=self.date()
+                )
+
+
+def read_rows(path):
+    """Построчно читает JSONL или CSV (по расширению); `-` — stdin."""
+    stream = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    try:
+        if path.endswith('.csv'):
+            yield from csv.DictReader(stream)
+        else:
+            for line in stream:
+                if line.strip():
+                    yield json.loads(line)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def _date(value, default):
+    if not value:
+        return default
+    value = parse_datetime(value)
+    if settings.USE_TZ and timezone.is_naive(value):
+        return timezone.make_aware(value)
+    if not settings.USE_TZ and timezone.is_aware(value):
+        return timezone.make_naive(value)
+    return value
+
+
+def _lookup(queryset, field, values):
+    values = {value for value in values if value}
+    return dict(
+        queryset.filter(**{f'{field}__in': values}).values_list(field, 'pk')
+    )
+
+
+def import_users(rows, batch_size=BATCH_SIZE):
+    password = make_password(None)
+    now = timezone.now()
+    return (
+        User(
+            username=row['username'],
+            first_name=row.get('first_name', ''),
+            last_name=row.get('last_name', ''),
+            email=row.get('email', ''),
+            password=password,
+            date_joined=_date(row.get('date_joined'), now),
+        )
+        for row in rows
+    )
+
+
+def import_groups(rows, batch_size=BATCH_SIZE):
+    return (
+        Group(
+            slug=row['slug'],
+            title=row.get('title') or row['slug'],
+            description=row.get('description', ''),
+        )
+        for row in rows
+    )
+
+
+def _resolved(rows, batch_size, resolve):
+    """Разрешает ссылки пачками по одному запросу на пачку."""
+    for batch in batches(rows, batch_size):
+        yield from resolve(batch)
+
+
+def import_posts(rows, batch_size=BATCH_SIZE):
+    def resolve(batch):
+        authors = _lookup(
+            User.objects, 'username', (row['author'] for row in batch)
+        )
+        groups = _lookup(
+            Group.objects, 'slug', (row.get('group') for row in batch)
+        )
+        now = timezone.now()
+        for row in batch:
+            if row['author'] not in authors:
+                continue
+            pub_date = _date(row.get('pub_date'), now)
+            yield Post(
+                id=row.get('id') or None,
+                author_id=authors[row['author']],
+                group_id=groups.get(row.get('group')),
+                text=row['text'],
+                pub_date=pub_date,
+                updated_at=pub_date,
+            )
+    return _resolved(rows, batch_size, resolve)
+
+
+def import_comments(rows, batch_size=BATCH_SIZE):
+    def resolve(batch):
+        authors = _lookup(
+            User.objects, 'username', (row['author'] for row in batch)
+        )
+        posts = set(Post.objects.filter(
+            pk__in={int(row['post']) for row in batch}
+        ).values_list('pk', flat=True))
+        now = timezone.now()
+        for row in batch:
+            if row['author'] in authors and int(row['post']) in posts:
+                yield Comment(
+                    post_id=int(row['post']),
+                    author_id=authors[row['author']],
+                    text=row['text'],
+                    created=_date(row.get('created'), now),
+                )
+    return _resolved(rows, batch_size, resolve)
+
+
+def import_follows(rows, batch_size=BATCH_SIZE):
+    def resolve(batch):
+        users = _lookup(User.objects, 'username', (
+            name for row in batch for name in (row['user'], row['author'])
+        ))
+        for row in batch:
+            user_id = users.get(row['user'])
+            author_id = users.get(row['author'])
+            if user_id and author_id and user_id != author_id:
+                # Без даты в источнике подписка не считается новой.
+                yield Follow(
+                    user_id=user_id, author_id=author_id,
+                    created=_date(row.get('created'), None),
+                )
+    return _resolved(rows, batch_size, resolve)
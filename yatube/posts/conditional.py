@@ -0,0 +1,77 @@
+"""Условные GET-запросы (ETag / Last-Modified) для лент и страницы поста.
+
+Валидатор ленты — текущие версии тегов кеша страниц (см. `page_cache`):
+любая запись, меняющая ленту, уже сбрасывает её теги, поэтому проверка
+стоит одного чтения кеша и не зависит от числа постов. У страницы поста
+валидатор — `updated_at` поста (комментарии сдвигают его), счётчик
+постов автора и сброшенные просмотры, одним запросом по первичному
+ключу. В ETag входят также
+адрес страницы с курсором и текущий пользователь, так как шапка и кнопки
+зависят от него. Если валидатор совпал с присланным клиентом, view не
+вызывается и отдаётся 304.
+"""
+import hashlib
+
+from django.views.decorators.http import condition
+
+from core.cache import tag_versions
+from . import page_cache
+from .models import Post
+
+
+def conditional_page(validator):
+    """Оборачивает view в `condition` с общим валидатором.
+
+    `validator(request, *args, **kwargs)` возвращает пару
+    `(last_modified, state)` или None, если страницы нет.
+    """
+    def current(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        if not hasattr(request, 'page_validator'):
+            request.page_validator = validator(request, *args, **kwargs)
+        return request.page_validator
+
+    def etag(request, *args, **kwargs):
+        result = current(request, *args, **kwargs)
+        if result is None:
+            return None
+        key = repr((request.get_full_path(), request.user.pk, result))
+        return hashlib.md5(key.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        # Last-Modified не различает пользователей, поэтому только
+        # для анонимных посетителей; остальным хватает ETag.
+        result = current(request, *args, **kwargs)
+        if result is None or request.user.is_authenticated:
+            return None
+        return result[0]
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def tagged(tags):
+    """Валидатор из версий тегов страницы; даты изменения у него нет."""
+    def validator(request, *args, **kwargs):
+        page_tags = tags(request, *args, **kwargs)
+        if page_tags is None:
+            return None
+        return None, tag_versions(page_tags)
+    return validator
+
+
+index_validator = tagged(page_cache.index_tags)
+trending_validator = tagged(page_cache.trending_tags)
+group_validator = tagged(page_cache.group_tags)
+profile_validator = tagged(page_cache.profile_tags)
+follow_validator = tagged(page_cache.follow_tags)
+
+
+def post_validator(request, post_id):
+    values = Post.objects.filter(pk=post_id).values_list(
+        'updated_at', 'author__stats__posts_count', 'views_count'
+    ).first()
+    if values is None:
+        return None
+    updated_at, *state = values
+    return updated_at, state
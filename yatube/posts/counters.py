@@ -0,0 +1,126 @@
+"""Денормализованные счётчики постов и пользователей.
+
+Счётчики меняются атомарным `UPDATE ... SET x = x + 1` в той же
+транзакции, что и изменившая их запись, поэтому страницы читают готовое
+число вместо `COUNT(*)`. Расхождения, если они всё же накопились,
+исправляет команда `manage.py recount_stats`.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def _count_subquery(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        Value(0),
+    )
+
+
+def actual_stats():
+    """Пользователи с посчитанными заново значениями счётчиков."""
+    return User.objects.annotate(
+        actual_posts=_count_subquery(Post.objects.all(), 'author'),
+        actual_followers=_count_subquery(Follow.objects.all(), 'author'),
+        actual_following=_count_subquery(Follow.objects.all(), 'user'),
+    )
+
+
+def ensure_stats(user_id):
+    """Возвращает статистику пользователя, создавая её при отсутствии."""
+    try:
+        return UserStats.objects.get(user_id=user_id)
+    except UserStats.DoesNotExist:
+        user = actual_stats().get(pk=user_id)
+        try:
+            with transaction.atomic():
+                return UserStats.objects.create(
+                    user_id=user_id,
+                    posts_count=user.actual_posts,
+                    followers_count=user.actual_followers,
+                    following_count=user.actual_following,
+                )
+        except IntegrityError:
+            return UserStats.objects.get(user_id=user_id)
+
+
+def bump_user(user_id, field, delta):
+    updated = UserStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta}
+    )
+    if not updated and delta > 0 and (
+        User.objects.filter(pk=user_id).exists()
+    ):
+        # Строки не было: ensure_stats посчитает значение с нуля,
+        # уже с учётом только что сохранённой записи.
+        ensure_stats(user_id)
+
+
+def bump_comments(post_id, delta):
+    # updated_at сдвигается вместе со счётчиком: от него зависит версия
+    # закешированной карточки поста.
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta,
+        updated_at=timezone.now(),
+    )
+
+
+def bump_follows(user_id, author_ids, delta):
+    """Сдвигает число подписок пользователя и подписчиков авторов на
+    `delta` за каждую добавленную или удалённую подписку."""
+    bump_user(user_id, 'following_count', delta * len(author_ids))
+    updated = UserStats.objects.filter(user_id__in=author_ids).update(
+        followers_count=F('followers_count') + delta
+    )
+    if updated < len(author_ids):
+        missing = set(author_ids) - set(UserStats.objects.filter(
+            user_id__in=author_ids
+        ).values_list('user_id', flat=True))
+        for author_id in missing:
+            ensure_stats(author_id)
+
+
+def recount_posts():
+    """Пересчитывает `Post.comments_count`; возвращает число исправленных."""
+    actual = _count_subquery(Comment.objects.all(), 'post')
+    drifted = Post.objects.annotate(actual=actual).exclude(
+        comments_count=F('actual')
+    )
+    fixed = drifted.count()
+    if fixed:
+        Post.objects.update(comments_count=actual)
+    return fixed
+
+
+def recount_users():
+    """Создаёт недостающие `UserStats` и чинит разошедшиеся счётчики."""
+    missing = User.objects.filter(stats__isnull=True).values_list(
+        'pk', flat=True
+    )
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=pk) for pk in missing.iterator()),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    drifted = actual_stats().exclude(
+        stats__posts_count=F('actual_posts'),
+        stats__followers_count=F('actual_followers'),
+        stats__following_count=F('actual_following'),
+    )
+    fixed = drifted.count()
+    if fixed:
+        UserStats.objects.update(
+            posts_count=_count_subquery(Post.objects.all(), 'author'),
+            followers_count=_count_subquery(Follow.objects.all(), 'author'),
+            following_count=_count_subquery(Follow.objects.all(), 'user'),
+        )
+    return fixed
@@ -0,0 +1,151 @@
+"""Лента подписок с раздачей постов при записи (fan-out-on-write).
+
+Новый пост сразу раскладывается по лентам подписчиков автора
+(`TimelineEntry`), поэтому `follow_index` читает готовую ленту, а не
+соединяет `Follow` и `Post` на каждый запрос. Для авторов, у которых
+подписчиков не меньше `FEED_FANOUT_LIMIT`, раздача не выполняется —
+их посты подмешиваются в ленту при чтении (fan-out-on-read).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, F, Q
+
+from .models import Follow, Post, TimelineEntry
+
+CELEBRITIES_CACHE_KEY = 'feed:celebrities'
+BATCH_SIZE = 500
+
+
+def celebrity_ids():
+    """Множество id авторов, чьи посты читаются без раздачи."""
+    ids = cache.get(CELEBRITIES_CACHE_KEY)
+    if ids is None:
+        ids = set(
+            Follow.objects.values('author')
+            .annotate(followers=Count('id'))
+            .filter(followers__gte=settings.FEED_FANOUT_LIMIT)
+            .values_list('author', flat=True)
+        )
+        cache.set(CELEBRITIES_CACHE_KEY, ids, None)
+    return ids
+
+
+def is_celebrity(author_id):
+    return author_id in celebrity_ids()
+
+
+def _bulk_insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def fan_out_post(post):
+    """Кладёт новый пост в ленты всех подписчиков автора."""
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _bulk_insert(
+        TimelineEntry(
+            user_id=user_id, post_id=post.pk, pub_date=post.pub_date
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика уже опубликованные посты автора."""
+    if is_celebrity(author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('pk', 'pub_date')
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты посты автора, от которого отписались."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def update_celebrity(author_id):
+    """Переводит автора между режимами раздачи при смене числа подписчиков.
+
+    Автору, опустившемуся ниже порога, ленты подписчиков дозаполняются
+    постами, опубликованными без раздачи.
+    """
+    followers = Follow.objects.filter(author_id=author_id).count()
+    ids = celebrity_ids()
+    if followers >= settings.FEED_FANOUT_LIMIT:
+        if author_id not in ids:
+            cache.set(CELEBRITIES_CACHE_KEY, ids | {author_id}, None)
+    elif author_id in ids:
+        cache.set(CELEBRITIES_CACHE_KEY, ids - {author_id}, None)
+        user_ids = Follow.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True)
+        for user_id in user_ids:
+            backfill(user_id, author_id)
+
+
+def rebuild_timelines():
+    """Заполняет ленты по всем подпискам одним INSERT ... SELECT.
+
+    Нужна после массовой загрузки, которая идёт мимо сигналов.
+    """
+    cache.delete(CELEBRITIES_CACHE_KEY)
+    celebrities = sorted(celebrity_ids())
+    entries, follows, posts = (
+        connection.ops.quote_name(model._meta.db_table)
+        for model in (TimelineEntry, Follow, Post)
+    )
+    # WHERE обязателен: без него SQLite путает ON CONFLICT с JOIN.
+    sql = (
+        f'INSERT INTO {entries} (user_id, post_id, pub_date) '
+        f'SELECT f.user_id, p.id, p.pub_date FROM {follows} f '
+        f'INNER JOIN {posts} p ON p.author_id = f.author_id WHERE 1 = 1'
+    )
+    if celebrities:
+        placeholders = ', '.join(['%s'] * len(celebrities))
+        sql += f' AND f.author_id NOT IN ({placeholders})'
+    with connection.cursor() as cursor:
+        cursor.execute(sql + ' ON CONFLICT DO NOTHING', celebrities)
+
+
+def follow_condition(user):
+    """Условие на посты ленты подписок и признак подмешанных авторов."""
+    condition = Q(timeline_entries__user=user)
+    celebrities = celebrity_ids()
+    if celebrities:
+        followed = set(
+            Follow.objects.filter(user=user).values_list(
+                'author_id', flat=True
+            )
+        )
+        pulled = followed & celebrities
+        if pulled:
+            return condition | Q(author_id__in=pulled), True
+    return condition, False
+
+
+def follow_feed(user):
+    """Посты ленты подписок пользователя.
+
+    Лента без постов популярных авторов упорядочена по полям
+    `TimelineEntry`, чтобы страница читалась из её индекса.
+    """
+    condition, merged = follow_condition(user)
+    if merged:
+        return Post.objects.filter(condition).distinct()
+    return Post.objects.filter(condition).annotate(
+        feed_date=F('timeline_entries__pub_date'),
+        feed_post=F('timeline_entries__post'),
+    ).order_by('-feed_date', '-feed_post')
@@ -0,0 +1,133 @@
+"""Граф подписок: проверки и запись.
+
+`is_following` — проверка по множеству id авторов пользователя, которое
+лежит в кеше и читается из БД одним запросом по индексу `(user, author)`
+при промахе. Любое изменение подписок пользователя сбрасывает его
+множество.
+
+`follow` и `unfollow` принимают сразу список авторов и идемпотентны:
+вставка идёт через `bulk_create(ignore_conflicts=True)`, удаление —
+`delete()` с приглушёнными сигналами подписок. Учёт (счётчики, задания,
+кеш) ведёт только `_changed`. Счётчики сдвигаются на число реально
+изменённых строк: подписки одного пользователя меняются по очереди под
+блокировкой строки его счётчиков, поэтому проверка существующих
+подписок не устаревает до записи. Полный пересчёт — команда
+`recount_stats`.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from core.cache import invalidate
+from jobs.queue import enqueue
+from . import counters, tasks
+from .models import Follow, Suggestion, User, UserStats
+
+_state = threading.local()
+
+
+def _cache_key(user_id):
+    return f'following:{user_id}'
+
+
+def following_ids(user_id):
+    """Множество id авторов, на которых подписан пользователь."""
+    key = _cache_key(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(
+            Follow.objects.filter(user_id=user_id).values_list(
+                'author_id', flat=True
+            )
+        )
+        cache.set(key, ids, settings.FOLLOW_CACHE_TIMEOUT)
+    return ids
+
+
+def is_following(user, author_id):
+    return user.is_authenticated and author_id in following_ids(user.pk)
+
+
+def forget(user_id):
+    """Сбрасывает множество подписок; в транзакции — ещё раз после неё."""
+    cache.delete(_cache_key(user_id))
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: cache.delete(_cache_key(user_id)))
+
+
+@contextmanager
+def signals_muted():
+    """Сигналы подписок внутри блока не ведут учёт: его делает `_changed`."""
+    previous = muted()
+    _state.muted = True
+    try:
+        yield
+    finally:
+        _state.muted = previous
+
+
+def muted():
+    return getattr(_state, 'muted', False)
+
+
+def _lock(user):
+    """Блокирует строку счётчиков пользователя до конца транзакции."""
+    counters.ensure_stats(user.pk)
+    list(UserStats.objects.select_for_update().filter(
+        user_id=user.pk
+    ).values_list('pk', flat=True))
+
+
+def _changed(user, authors, job, delta):
+    counters.bump_follows(user.pk, [author.pk for author in authors], delta)
+    for author in authors:
+        enqueue(job, user.pk, author.pk)
+    Suggestion.objects.filter(user=user, author__in=authors).delete()
+    enqueue(tasks.refresh_suggestions, [user.pk])
+    forget(user.pk)
+    invalidate(
+        f'feed:{user.pk}', f'profile:{user.username}',
+        *(f'profile:{author.username}' for author in authors),
+    )
+
+
+@transaction.atomic
+def follow(user, authors):
+    """Подписывает на авторов; возвращает тех, подписка на кого новая."""
+    authors = [author for author in authors if author.pk != user.pk]
+    _lock(user)
+    existing = set(Follow.objects.filter(
+        user=user, author__in=authors
+    ).values_list('author_id', flat=True))
+    added = [author for author in authors if author.pk not in existing]
+    Follow.objects.bulk_create(
+        [Follow(user=user, author=author) for author in added],
+        ignore_conflicts=True,
+    )
+    if added:
+        _changed(user, added, tasks.follow_added, 1)
+    return added
+
+
+@transaction.atomic
+def unfollow(user, authors):
+    """Отписывает от авторов; возвращает тех, подписка на кого была."""
+    _lock(user)
+    follows = Follow.objects.filter(user=user, author__in=authors)
+    existing = set(follows.values_list('author_id', flat=True))
+    removed = [author for author in authors if author.pk in existing]
+    if removed:
+        with signals_muted():
+            follows.delete()
+        _changed(user, removed, tasks.follow_removed, -1)
+    return removed
+
+
+def authors_by_username(usernames):
+    """Пользователи с указанными именами и имена, которых нет."""
+    authors = list(User.objects.filter(username__in=set(usernames)))
+    found = {author.username for author in authors}
+    return authors, sorted(set(usernames) - found)
@@ -1,4 +1,5 @@
 from django import forms
+from django.conf import settings
 
 from .models import Post, Comment
 
@@ -17,6 +18,31 @@ class PostForm(forms.ModelForm):
             'group': 'Группа, к которой будет относиться пост',
         }
 
+    def __init__(self, *args, upload_errors=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_errors = upload_errors or {}
+
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        # У нового файла ImageField уже разобрал заголовок картинки,
+        # размеры берём из него, не декодируя пиксели.
+        header = getattr(image, 'image', None)
+        if header is not None:
+            width, height = header.size
+            if width * height > settings.POST_IMAGE_MAX_PIXELS:
+                raise forms.ValidationError(
+                    'Слишком большое разрешение картинки: '
+                    f'{width}×{height}.'
+                )
+        return image
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for field, message in self.upload_errors.items():
+            if field in self.fields:
+                self.add_error(field, message)
+        return cleaned_data
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
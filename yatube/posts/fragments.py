@@ -0,0 +1,66 @@
+"""Персональные фрагменты страниц постов (см. `core.esi`)."""
+from django.conf import settings
+
+from core.esi import fragment
+from . import follows, recommendations
+from .forms import CommentForm
+from .models import Post, Suggestion
+
+
+@fragment('feed_switcher', 'posts/includes/switcher.html')
+def feed_switcher(request, active=''):
+    return {'active': active}
+
+
+@fragment('follow_button', 'posts/includes/follow_button.html')
+def follow_button(request, author, author_id):
+    following = follows.is_following(request.user, int(author_id))
+    return {'author_username': author, 'following': following}
+
+
+@fragment('post_edit_link', 'posts/includes/edit_link.html')
+def post_edit_link(request, post):
+    return {'post_id': post}
+
+
+@fragment('post_views', 'posts/includes/post_views.html', shared=True)
+def post_views(request, post):
+    """Счётчик просмотров растёт чаще, чем меняется каркас страницы."""
+    views = Post.objects.filter(pk=post).values_list(
+        'views_count', flat=True
+    ).first()
+    return {'views_count': views or 0}
+
+
+@fragment('comment_form', 'posts/includes/comment_form.html')
+def comment_form(request, post):
+    reply_to = request.GET.get('reply_to', '')
+    return {
+        'post_id': post,
+        'form': CommentForm(),
+        'reply_to': reply_to if reply_to.isdigit() else None,
+    }
+
+
+@fragment('who_to_follow', 'posts/includes/who_to_follow.html')
+def who_to_follow(request):
+    """Готовые рекомендации из таблицы или самые популярные авторы.
+
+    Авторов, на которых пользователь подписался, `follows` удаляет из
+    его рекомендаций сразу, поэтому здесь их отсеивать не нужно.
+    """
+    if not request.user.is_authenticated:
+        return {'suggestions': ()}
+    shown = settings.RECOMMENDATIONS_SHOWN
+    suggestions = list(Suggestion.objects.filter(
+        user=request.user
+    ).select_related('author')[:shown])
+    if not suggestions:
+        authors = recommendations.popular()
+        if authors:
+            followed = follows.following_ids(request.user.pk)
+            suggestions = [
+                Suggestion(author=author) for author in authors
+                if author.pk not in followed and author.pk != request.user.pk
+            ][:shown]
+    return {'suggestions': suggestions}
@@ -0,0 +1,112 @@
+"""Адаптивные варианты картинок постов для `srcset`.
+
+Картинка поста обрезается до пропорций карточки и сохраняется в
+нескольких ширинах (`POST_IMAGE_WIDTHS`) и форматах (`POST_IMAGE_FORMATS`);
+форматы, которые не умеет записывать установленный Pillow, пропускаются.
+Размеры и вес каждого файла хранятся в `PostImageVariant`.
+"""
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .models import PostImageVariant
+
+CONTENT_TYPES = {
+    'AVIF': 'image/avif',
+    'WEBP': 'image/webp',
+    'JPEG': 'image/jpeg',
+}
+EXTENSIONS = {
+    'AVIF': 'avif',
+    'WEBP': 'webp',
+    'JPEG': 'jpg',
+}
+
+
+def supported_formats():
+    Image.init()
+    return [
+        image_format for image_format in settings.POST_IMAGE_FORMATS
+        if image_format in Image.SAVE
+    ]
+
+
+def card_aspect():
+    geometry, _ = settings.POST_THUMBNAILS['card']
+    width, height = geometry.split('x')
+    return int(height) / int(width)
+
+
+def target_widths(source_width):
+    """Ширины вариантов без увеличения; картинка уже самого узкого
+    варианта получает один вариант своей ширины."""
+    widths = sorted(settings.POST_IMAGE_WIDTHS)
+    return [
+        width for width in widths if width <= source_width
+    ] or [source_width]
+
+
+def _encode(image, image_format):
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, image_format, quality=settings.POST_IMAGE_QUALITY)
+    return buffer.getvalue()
+
+
+def build(post):
+    """Пересоздаёт все варианты картинки поста."""
+    variants = sorted(
+        post.image_variants.all(),
+        key=lambda variant: (variant.format, variant.width),
+    )
+    for variant in variants:
+        variant.image.delete(save=False)
+    post.image_variants.all().delete()
+    if not post.image:
+        return []
+    formats = supported_formats()
+    aspect = card_aspect()
+    variants = []
+    with Image.open(post.image) as source:
+        source.load()
+        if source.mode not in ('RGB', 'RGBA'):
+            source = source.convert('RGBA')
+        for width in target_widths(source.width):
+            size = (width, round(width * aspect))
+            resized = ImageOps.fit(source, size, Image.LANCZOS)
+            for image_format in formats:
+                content = _encode(resized, image_format)
+                variant = PostImageVariant(
+                    post=post, format=image_format, size=len(content)
+                )
+                variant.image.save(
+                    f'{post.pk}_{width}.{EXTENSIONS[image_format]}',
+                    ContentFile(content),
+                    save=False,
+                )
+                variants.append(variant)
+    return PostImageVariant.objects.bulk_create(variants)
+
+
+def sources(post):
+    """Источники для <picture>: MIME-тип и srcset по форматам."""
+    grouped = {}
+    variants = sorted(
+        post.image_variants.all(),
+        key=lambda variant: (variant.format, variant.width),
+    )
+    for variant in variants:
+        grouped.setdefault(variant.format, []).append(
+            f'{variant.image.url} {variant.width}w'
+        )
+    return [
+        {
+            'type': CONTENT_TYPES[image_format],
+            'srcset': ', '.join(grouped[image_format]),
+        }
+        for image_format in settings.POST_IMAGE_FORMATS
+        if image_format in grouped
+    ]
@@ -0,0 +1,81 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время ответа, число SQL-запросов и память страниц постов '
+        'и сравнивает с базовыми результатами. Запускайте на отдельной БД '
+        '(DB_NAME=bench.sqlite3): с --prepare в неё генерируются данные.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', choices=benchmarks.SCALES, default='10k'
+        )
+        parser.add_argument(
+            '--prepare', action='store_true',
+            help='Сгенерировать данные до размера --scale',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--only', nargs='+', metavar='VIEW',
+            help='Замерить только перечисленные сценарии',
+        )
+        parser.add_argument(
+            '--cache', action='store_true',
+            help='Не выключать кеш страниц',
+        )
+        parser.add_argument('--baseline', help='JSON с базовыми результатами')
+        parser.add_argument(
+            '--threshold', type=float, default=0.25,
+            help='Допустимый рост времени и памяти (0.25 — на 25%%)',
+        )
+        parser.add_argument(
+            '--save', metavar='FILE', help='Записать результаты в JSON'
+        )
+
+    def handle(self, *args, **options):
+        if options['prepare']:
+            benchmarks.prepare(
+                options['scale'], options['seed'], stdout=self.stdout
+            )
+        results = benchmarks.run(
+            names=options['only'],
+            iterations=options['iterations'],
+            warmup=options['warmup'],
+            cache=options['cache'],
+        )
+        self.stdout.write(
+            f"{'view':<14}{'p50, мс':>10}{'p95, мс':>10}"
+            f"{'SQL':>6}{'SQL, мс':>10}{'Память, МБ':>12}"
+        )
+        for name, metrics in results.items():
+            self.stdout.write(
+                f"{name:<14}{metrics['p50_ms']:>10}{metrics['p95_ms']:>10}"
+                f"{metrics['queries']:>6}{metrics['sql_ms']:>10}"
+                f"{metrics['peak_mem_mb']:>12}"
+            )
+        if options['save']:
+            with open(options['save'], 'w') as file:
+                json.dump(
+                    benchmarks.report(options['scale'], results),
+                    file, indent=2, ensure_ascii=False,
+                )
+                file.write('\n')
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                baseline = json.load(file)
+            regressions = benchmarks.compare(
+                baseline, results, options['threshold']
+            )
+            if regressions:
+                raise CommandError(
+                    'Регрессии производительности:\n' + '\n'.join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS('Регрессий нет'))
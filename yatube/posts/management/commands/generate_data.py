@@ -0,0 +1,79 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import bulk_load
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует пользователей, группы, посты, комментарии и подписки '
+        'для нагрузочного тестирования. Авторы постов, популярность '
+        'постов и число подписчиков распределены по степенному закону.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=10000)
+        parser.add_argument(
+            '--alpha', type=float, default=1.2,
+            help='Показатель степенного закона (больше — сильнее перекос)',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней разбросаны даты публикаций',
+        )
+        parser.add_argument(
+            '--prefix', default='load',
+            help='Префикс имён пользователей и адресов групп',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=bulk_load.BATCH_SIZE
+        )
+        parser.add_argument(
+            '--keep-indexes', action='store_true',
+            help='Не снимать индексы на время загрузки',
+        )
+
+    def handle(self, *args, **options):
+        generator = bulk_load.Generator(
+            seed=options['seed'],
+            alpha=options['alpha'],
+            days=options['days'],
+            prefix=options['prefix'],
+        )
+        batch_size = options['batch_size']
+        started = time.monotonic()
+
+        def step(name, model, objects):
+            created = bulk_load.insert(model, objects, batch_size)
+            self.stdout.write(
+                f'{name}: {created} ({time.monotonic() - started:.1f} с)'
+            )
+
+        with bulk_load.loading(defer_indexes=not options['keep_indexes']):
+            step('users', User, generator.users(options['users']))
+            step('groups', Group, generator.groups(options['groups']))
+            user_ids = bulk_load.pks(User.objects.all())
+            group_ids = bulk_load.pks(Group.objects.all())
+            if user_ids:
+                step('posts', Post, generator.posts(
+                    options['posts'], user_ids, group_ids
+                ))
+                step('follows', Follow, generator.follows(
+                    options['follows'], user_ids
+                ))
+            post_ids = bulk_load.pks(Post.objects.all())
+            if user_ids and post_ids:
+                step('comments', Comment, generator.comments(
+                    options['comments'], user_ids, post_ids
+                ))
+        bulk_load.rebuild_derived()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.1f} с'
+        ))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from posts import bulk_load
+from posts.models import Comment, Follow, Group, Post, User
+
+# Порядок загрузки: записи ссылаются на загруженные раньше.
+SOURCES = (
+    ('users', User, bulk_load.import_users),
+    ('groups', Group, bulk_load.import_groups),
+    ('posts', Post, bulk_load.import_posts),
+    ('comments', Comment, bulk_load.import_comments),
+    ('follows', Follow, bulk_load.import_follows),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает данные из файлов JSONL или CSV (по расширению, '
+        '`-` — stdin) потоково, пачками. Ссылки задаются естественными '
+        'ключами: author/user — username, group — slug, post — id поста.'
+    )
+
+    def add_arguments(self, parser):
+        for name, _, _ in SOURCES:
+            parser.add_argument(f'--{name}', metavar='FILE')
+        parser.add_argument(
+            '--batch-size', type=int, default=bulk_load.BATCH_SIZE
+        )
+        parser.add_argument(
+            '--keep-indexes', action='store_true',
+            help='Не снимать индексы на время загрузки',
+        )
+
+    def handle(self, *args, batch_size, keep_indexes, **options):
+        with bulk_load.loading(defer_indexes=not keep_indexes):
+            for name, model, parse in SOURCES:
+                if not options[name]:
+                    continue
+                rows = bulk_load.read_rows(options[name])
+                objects = parse(rows, batch_size)
+                created = bulk_load.insert(model, objects, batch_size)
+                self.stdout.write(f'{name}: {created}')
+        if options['posts']:
+            bulk_load.reset_sequences(Post)
+        bulk_load.rebuild_derived()
+        self.stdout.write(self.style.SUCCESS('Готово'))
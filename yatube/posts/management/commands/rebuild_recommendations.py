@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobs.models import Job
+from jobs.queue import enqueue
+from posts import recommendations, tasks
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации «на кого подписаться» по всему графу '
+        'подписок. С --schedule вместо этого ставит в очередь '
+        'периодический пересчёт.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--schedule', action='store_true',
+            help='Запустить периодическую задачу, если её ещё нет',
+        )
+
+    def handle(self, *args, schedule, **options):
+        if schedule:
+            name = tasks.rebuild_suggestions.job_name
+            if Job.objects.filter(name=name).exclude(
+                status=Job.FAILED
+            ).exists():
+                self.stdout.write('Периодический пересчёт уже запланирован')
+                return
+            enqueue(tasks.rebuild_suggestions)
+            self.stdout.write(self.style.SUCCESS('Пересчёт запланирован'))
+            return
+        started = time.monotonic()
+        total = recommendations.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Рекомендаций: {total} за {time.monotonic() - started:.1f} с'
+        ))
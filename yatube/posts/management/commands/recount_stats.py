@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики постов и пользователей'
+
+    def handle(self, *args, **options):
+        posts = counters.recount_posts()
+        users = counters.recount_users()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено постов: {posts}, пользователей: {users}'
+        ))
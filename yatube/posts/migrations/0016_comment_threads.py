@@ -0,0 +1,40 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import F, Value
+from django.db.models.functions import Cast, LPad
+
+
+def fill_root_paths(apps, schema_editor):
+    # Все существующие комментарии — корни веток (см. posts.models).
+    Comment = apps.get_model('posts', 'Comment')
+    Comment.objects.update(path=LPad(
+        Cast(Value(10 ** 10 - 1) - F('id'), models.CharField()),
+        10, Value('0'),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='posts.Comment', verbose_name='Ответ на'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='comment_post_path_idx'),
+        ),
+        migrations.RunPython(fill_root_paths, migrations.RunPython.noop),
+    ]
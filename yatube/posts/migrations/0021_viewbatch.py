@@ -0,0 +1,32 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_userstats_followers_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ViewBatch',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('views', models.PositiveIntegerField(verbose_name='Просмотров')),
+                ('created', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата сброса')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_batches', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Просмотры поста',
+                'verbose_name_plural': 'Просмотры постов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='viewbatch',
+            index=models.Index(fields=['created', 'post', 'views'], name='viewbatch_created_idx'),
+        ),
+    ]
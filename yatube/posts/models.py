@@ -1,4 +1,7 @@
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Cast, LPad
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 
@@ -14,6 +17,25 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self, images=True):
+        """Посты для лент: автор и группа одним запросом, варианты
+        картинок для <picture> — вторым на всю страницу. JSON API картинки
+        не отдаёт и передаёт `images=False`."""
+        posts = self.select_related('author', 'group').defer(
+            'author__password',
+            'group__description',
+        )
+        if images:
+            # Без сортировки: порядок наводит `image_variants.sources`,
+            # а ORDER BY по списку постов стоил бы временного B-дерева.
+            posts = posts.prefetch_related(models.Prefetch(
+                'image_variants',
+                queryset=PostImageVariant.objects.order_by(),
+            ))
+        return posts
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст поста',
@@ -22,7 +44,10 @@ class Post(models.Model):
     pub_date = models.DateTimeField(
         'Дата публикации',
         auto_now_add=True,
-        db_index=True
+    )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
     )
     author = models.ForeignKey(
         User,
@@ -45,14 +70,122 @@ class Post(models.Model):
         blank=True,
     )
 
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False,
+    )
+    views_count = models.PositiveIntegerField(
+        'Число просмотров',
+        default=0,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
+
+    COUNTER_FIELDS = ('comments_count', 'views_count')
+
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        # Индексы повторяют порядок лент, чтобы страница читалась
+        # из индекса без сортировки.
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            # Отметка последнего изменения для условных GET.
+            models.Index(fields=['updated_at'], name='post_updated_at_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        # Счётчики меняются только атомарными UPDATE из posts.counters,
+        # поэтому при обычном сохранении их устаревшие значения не пишем.
+        if self.pk and not self._state.adding and (
+            kwargs.get('update_fields') is None
+        ):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+
+class PostImageVariant(models.Model):
+    """Уменьшенная копия картинки поста в одном из форматов."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='image_variants',
+        verbose_name='Пост'
+    )
+    image = models.ImageField(
+        'Файл',
+        upload_to='posts/variants/',
+        width_field='width',
+        height_field='height',
+    )
+    format = models.CharField('Формат', max_length=10)
+    width = models.PositiveIntegerField('Ширина')
+    height = models.PositiveIntegerField('Высота')
+    size = models.PositiveIntegerField('Размер, байт')
+
+    class Meta:
+        ordering = ['format', 'width']
+        verbose_name = 'Вариант картинки'
+        verbose_name_plural = 'Варианты картинок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'format', 'width'],
+                name='unique_post_image_variant'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}: {self.format} {self.width}w'
+
+
+# Путь комментария — цепочка сегментов по PATH_STEP цифр от корня ветки.
+# Сегмент корня — ROOT_BASE - id, ответа — id, поэтому при сортировке по
+# path ветки идут от новых к старым, а ответы внутри ветки — по порядку.
+PATH_STEP = 10
+ROOT_BASE = 10 ** PATH_STEP - 1
+MAX_DEPTH = 8
+
+
+def root_path(pk):
+    return f'{ROOT_BASE - pk:0{PATH_STEP}d}'
+
+
+class CommentQuerySet(models.QuerySet):
+    def threaded(self):
+        """Комментарии в порядке веток, с авторами одним запросом."""
+        return self.select_related('author').defer(
+            'author__password'
+        ).order_by('path')
+
+    def fill_root_paths(self):
+        """Проставляет путь корневым комментариям, вставленным без save()."""
+        return self.filter(path='', parent__isnull=True).update(
+            path=LPad(
+                Cast(Value(ROOT_BASE) - F('id'), models.CharField()),
+                PATH_STEP, Value('0'),
+            )
+        )
+
 
 class Comment(models.Model):
     text = models.TextField(
@@ -76,13 +209,50 @@ class Comment(models.Model):
         related_name='comments',
         help_text='Автор'
     )
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='replies',
+        verbose_name='Ответ на',
+    )
+    path = models.CharField(max_length=255, editable=False, default='')
+
+    objects = CommentQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['post', '-created'], name='comment_post_created_idx'
+            ),
+            models.Index(
+                fields=['post', 'path'], name='comment_post_path_idx'
+            ),
+            # Покрывающий индекс для агрегатов по свежим комментариям.
+            models.Index(
+                fields=['created', 'post'], name='comment_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:10]
 
+    @property
+    def depth(self):
+        return max(len(self.path) // PATH_STEP - 1, 0)
+
+    def save(self, *args, **kwargs):
+        # Путь строится из id, поэтому дописывается после вставки.
+        super().save(*args, **kwargs)
+        if not self.path:
+            if self.parent_id is None:
+                self.path = root_path(self.pk)
+            else:
+                self.path = f'{self.parent.path}{self.pk:0{PATH_STEP}d}'
+            Comment.objects.filter(pk=self.pk).update(path=self.path)
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -97,6 +267,180 @@ class Follow(models.Model):
         related_name='following',
         help_text='Блоггер'
     )
+    # У подписок, оформленных до появления поля, даты нет.
+    created = models.DateTimeField(
+        'Дата подписки', auto_now_add=True, null=True
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['created', 'author'], name='follow_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return 'Модель Follow'
+
+
+class Suggestion(models.Model):
+    """Рекомендация автора для подписки, посчитанная пакетным заданием."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='suggestions',
+        help_text='Кому рекомендован'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        help_text='Рекомендованный автор'
+    )
+    score = models.FloatField('Вес')
+    mutual = models.PositiveIntegerField(
+        'Общих подписок', default=0,
+        help_text='Сколько авторов из подписок пользователя подписаны на него'
+    )
+
+    class Meta:
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+        ordering = ['-score']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_suggestion'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-score'], name='suggestion_user_score_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} → {self.author}'
+
+
+class UserStats(models.Model):
+    """Денормализованные счётчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков', default=0
+    )
+    following_count = models.PositiveIntegerField('Число подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+        indexes = [
+            # Популярные авторы: первые строки по убыванию подписчиков.
+            models.Index(
+                fields=['-followers_count', 'user'],
+                name='stats_followers_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'Статистика {self.user}'
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        help_text='Владелец ленты'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        help_text='Пост в ленте'
+    )
+    # Копия даты поста: лента сортируется по индексу этой таблицы,
+    # без соединения с постами.
+    pub_date = models.DateTimeField('Дата публикации поста')
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} <- {self.post}'
+
+
+class TrendingPost(models.Model):
+    """Место поста в рейтинге популярного, посчитанном заданием."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+        verbose_name='Пост'
+    )
+    rank = models.PositiveIntegerField('Место', unique=True)
+    score = models.FloatField('Вес')
+
+    class Meta:
+        verbose_name = 'Популярный пост'
+        verbose_name_plural = 'Популярные посты'
+        ordering = ['rank']
+
+    def __str__(self):
+        return f'{self.rank}. {self.post}'
+
+
+class ViewBatch(models.Model):
+    """Просмотры поста, записанные одним сбросом буфера просмотров.
+
+    Это события для популярного: счётчик `Post.views_count` даты не
+    хранит, а веса затухают по возрасту. Строки старше окна популярного
+    удаляет его пересчёт.
+    """
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='view_batches',
+        verbose_name='Пост'
+    )
+    views = models.PositiveIntegerField('Просмотров')
+    created = models.DateTimeField('Дата сброса', default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Просмотры поста'
+        verbose_name_plural = 'Просмотры постов'
+        indexes = [
+            # Покрывающий индекс для окна популярного.
+            models.Index(
+                fields=['created', 'post', 'views'],
+                name='viewbatch_created_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.post}: +{self.views}'
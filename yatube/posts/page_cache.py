@@ -0,0 +1,154 @@
+"""Теги кеша страниц постов и их сброс при изменениях.
+
+Страница помечается тегами того, что на ней показано, а сигналы
+моделей сбрасывают теги изменившихся объектов:
+
+* `posts` — главная;
+* `trending` — популярное: страница и боковая колонка групп на главной,
+  сбрасывается пересчётом рейтингов;
+* `group:<slug>` — лента группы, `groups` — названия групп у постов;
+* `profile:<username>` — профиль автора со счётчиками;
+* `post:<id>` — страница поста;
+* `feed:<user_id>` — лента подписок пользователя. Посты популярных
+  авторов в ленты не раздаются, поэтому лента с ними помечена ещё и
+  `celebrity:<author_id>`. Эти теги сбрасывают задания очереди: у автора
+  могут быть тысячи подписчиков.
+"""
+from core.cache import invalidate
+from . import feed
+from .models import Follow, Group, Post, User
+
+
+def index_tags(request):
+    return ['posts', 'trending']
+
+
+def trending_tags(request):
+    return ['posts', 'trending']
+
+
+def group_tags(request, slug):
+    return [f'group:{slug}']
+
+
+def profile_tags(request, username):
+    return [f'profile:{username}']
+
+
+def post_detail_tags(request, post_id):
+    row = Post.objects.filter(pk=post_id).values_list(
+        'author__username', 'group'
+    ).first()
+    if row is None:
+        return None
+    return detail_tags(post_id, *row)
+
+
+def detail_tags(post_id, username, group_id):
+    """Теги страницы поста по имени автора и группе."""
+    tags = [f'post:{post_id}', f'profile:{username}']
+    if group_id is not None:
+        tags.append('groups')
+    return tags
+
+
+def comments_tags(request, post_id):
+    return [f'post:{post_id}']
+
+
+def follow_tags(request):
+    tags = [f'feed:{request.user.pk}']
+    celebrities = feed.celebrity_ids()
+    if celebrities:
+        followed = Follow.objects.filter(
+            user=request.user, author__in=celebrities
+        ).values_list('author_id', flat=True)
+        tags.extend(f'celebrity:{author_id}' for author_id in followed)
+    return tags
+
+
+def post_changed(post):
+    """Сбрасывает главную, страницы поста, автора и группы.
+
+    Ленты подписчиков здесь не трогаем: их тысячи, и сбрасывает их
+    задание (`feeds_changed`), а не запрос.
+    """
+    tags = ['posts', *_post_tags(post)]
+    invalidate(*tags)
+
+
+def comment_changed(post):
+    """Сбрасывает страницы, на которых видны комментарии поста или их
+    число в карточке; ленты подписчиков — задание, как у `post_changed`."""
+    invalidate(*index_tags(None), *_post_tags(post))
+
+
+def _post_tags(post):
+    tags = [f'post:{post.pk}', f'profile:{post.author.username}']
+    if post.group_id is not None:
+        tags.append(f'group:{post.group.slug}')
+    return tags
+
+
+def feeds_changed(author_id):
+    """Сбрасывает ленты подписок, в которых видны посты автора."""
+    if feed.is_celebrity(author_id):
+        invalidate(f'celebrity:{author_id}')
+        return
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    invalidate(*(f'feed:{user_id}' for user_id in followers))
+
+
+def post_moving(post):
+    """Сбрасывает ленту группы, из которой пост переносят."""
+    slug = Group.objects.filter(posts__pk=post.pk).values_list(
+        'slug', flat=True
+    ).first()
+    if slug is not None:
+        invalidate(f'group:{slug}')
+
+
+def follow_changed(follow):
+    invalidate(
+        f'feed:{follow.user_id}',
+        f'profile:{follow.user.username}',
+        f'profile:{follow.author.username}',
+    )
+
+
+def group_changed(group):
+    invalidate(f'group:{group.slug}', 'groups')
+
+
+def user_changed(user):
+    invalidate(f'profile:{user.username}')
+
+
+def user_renaming(user):
+    """Сбрасывает страницы, помеченные прежним именем пользователя."""
+    username = User.objects.filter(pk=user.pk).values_list(
+        'username', flat=True
+    ).first()
+    if username not in (None, user.username):
+        invalidate(f'profile:{username}')
+
+
+def author_renamed(author_id):
+    """Сбрасывает ленты с карточками постов автора: в них его имя."""
+    slugs = Group.objects.filter(posts__author_id=author_id).values_list(
+        'slug', flat=True
+    ).distinct()
+    invalidate('posts', *(f'group:{slug}' for slug in slugs))
+    feeds_changed(author_id)
+
+
+def group_renamed(group_id):
+    """Сбрасывает ленты с карточками постов группы: в них её адрес."""
+    authors = Post.objects.filter(group_id=group_id).values_list(
+        'author_id', 'author__username'
+    ).order_by().distinct()
+    invalidate('posts', *(f'profile:{username}' for _, username in authors))
+    for author_id, _ in authors:
+        feeds_changed(author_id)
@@ -0,0 +1,236 @@
+"""Рекомендации «на кого подписаться».
+
+Подписки — разреженная матрица смежности A (строка — подписчик, столбец —
+автор), хранимая списками id по строкам (`following`) и столбцам
+(`followers`). Вес кандидата для пользователя складывается из двух
+произведений:
+
+* друзья друзей — строка A²: сколько авторов из подписок пользователя
+  подписаны на кандидата (это же число показывается как `mutual`);
+* совместные подписки — строка A·S, где S = Aᵀ·A с косинусной
+  нормировкой: на кандидата подписаны те же люди, что и на авторов
+  пользователя. Столбец S считается один раз на автора и урезается до
+  `SIMILAR_AUTHORS` лучших; у популярных авторов берётся выборка
+  последних `RECOMMENDATIONS_SAMPLE` подписчиков, поэтому стоимость не
+  растёт с их аудиторией.
+
+Рекомендации считаются заданиями очереди и лежат в таблице `Suggestion`
+по `RECOMMENDATIONS_SIZE` на пользователя; страницы только читают её.
+Полный пересчёт (`rebuild`) держит граф в памяти и пишет пачками,
+точечный (`refresh`) загружает окрестность нужных пользователей.
+"""
+import heapq
+import math
+from array import array
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from .bulk_load import batches
+from .models import Follow, Suggestion, User, UserStats
+
+BATCH_SIZE = 500
+# Сколько похожих авторов хранится для каждого автора графа.
+SIMILAR_AUTHORS = 50
+POPULAR_CACHE_KEY = 'suggestions:popular'
+
+
+class Graph:
+    """Рёбра подписок, сгруппированные по подписчикам и по авторам.
+
+    В полном графе число подписчиков автора — длина его столбца; в
+    окрестности столбцы урезаны выборкой, и число берётся из `UserStats`.
+    """
+
+    def __init__(self, edges, complete):
+        following, followers = defaultdict(list), defaultdict(list)
+        for user_id, author_id in edges:
+            following[user_id].append(author_id)
+            followers[author_id].append(user_id)
+        self.following = {
+            user_id: array('q', ids) for user_id, ids in following.items()
+        }
+        self.followers = {
+            author_id: array('q', ids) for author_id, ids in followers.items()
+        }
+        self.complete = complete
+        self._popularity = {}
+        self._similar = {}
+
+    @classmethod
+    def load(cls):
+        edges = Follow.objects.order_by('pk').values_list('user', 'author')
+        return cls(edges.iterator(), complete=True)
+
+    @classmethod
+    def around(cls, user_ids, sample=None):
+        """Окрестность пользователей: их подписки, подписки этих авторов,
+        выборка подписчиков этих авторов и подписки подписчиков."""
+        sample = sample or settings.RECOMMENDATIONS_SAMPLE
+        edges = set(_edges_from(user_ids))
+        authors = {author_id for _, author_id in edges}
+        edges.update(_edges_from(authors))
+        sampled = set(_sampled_followers(authors, sample))
+        edges.update(sampled)
+        edges.update(_edges_from({user_id for user_id, _ in sampled}))
+        return cls(sorted(edges), complete=False)
+
+    def popularity(self, author_ids):
+        """Число подписчиков авторов (не меньше одного)."""
+        missing = [pk for pk in author_ids if pk not in self._popularity]
+        if self.complete:
+            for pk in missing:
+                self._popularity[pk] = len(self.followers.get(pk, ()))
+        else:
+            for batch in batches(missing, BATCH_SIZE):
+                self._popularity.update(UserStats.objects.filter(
+                    pk__in=batch
+                ).values_list('pk', 'followers_count'))
+        return {
+            pk: max(self._popularity.get(pk, 0), 1) for pk in author_ids
+        }
+
+    def similar(self, author_id):
+        """Похожие авторы; считаются один раз на граф."""
+        if author_id not in self._similar:
+            self._similar[author_id] = similar_authors(self, author_id)
+        return self._similar[author_id]
+
+
+def _edges_from(user_ids):
+    for batch in batches(user_ids, BATCH_SIZE):
+        yield from Follow.objects.filter(user__in=batch).values_list(
+            'user', 'author'
+        )
+
+
+def _sampled_followers(author_ids, sample):
+    """Последние `sample` подписчиков каждого автора одним запросом."""
+    table = connection.ops.quote_name(Follow._meta.db_table)
+    with connection.cursor() as cursor:
+        for batch in batches(author_ids, BATCH_SIZE):
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(
+                f'SELECT user_id, author_id FROM ('
+                f'SELECT user_id, author_id, ROW_NUMBER() OVER ('
+                f'PARTITION BY author_id ORDER BY id DESC) AS position '
+                f'FROM {table} WHERE author_id IN ({placeholders})'
+                f') sampled WHERE position <= %s',
+                [*batch, sample],
+            )
+            yield from cursor.fetchall()
+
+
+def similar_authors(graph, author_id):
+    """Авторы с похожей аудиторией: столбец Aᵀ·A с косинусной мерой."""
+    sample = settings.RECOMMENDATIONS_SAMPLE
+    followers = graph.followers.get(author_id, ())[-sample:]
+    hits = Counter()
+    for follower_id in followers:
+        hits.update(graph.following.get(follower_id, ()))
+    hits.pop(author_id, None)
+    if not hits:
+        return ()
+    popularity = graph.popularity(hits.keys() | {author_id})
+    # Пересечение аудиторий оценивается по выборке подписчиков.
+    scale = math.sqrt(popularity[author_id]) / len(followers)
+    return heapq.nlargest(
+        SIMILAR_AUTHORS,
+        (
+            (candidate, count * scale / math.sqrt(popularity[candidate]))
+            for candidate, count in hits.items()
+        ),
+        key=lambda item: item[1],
+    )
+
+
+def suggest(graph, user_id, size=None):
+    """Лучшие кандидаты: список `(author_id, вес, общих подписок)`."""
+    size = size or settings.RECOMMENDATIONS_SIZE
+    followed = set(graph.following.get(user_id, ()))
+    mutual = Counter()
+    similar = Counter()
+    for author_id in followed:
+        mutual.update(graph.following.get(author_id, ()))
+        for candidate, weight in graph.similar(author_id):
+            similar[candidate] += weight
+    candidates = (mutual.keys() | similar.keys()) - followed - {user_id}
+    weight = settings.RECOMMENDATIONS_COFOLLOW_WEIGHT
+    return heapq.nlargest(
+        size,
+        (
+            (
+                candidate,
+                mutual[candidate] + weight * similar[candidate],
+                mutual[candidate],
+            )
+            for candidate in candidates
+        ),
+        key=lambda item: item[1],
+    )
+
+
+def store(graph, user_ids):
+    """Заменяет рекомендации пользователей посчитанными по графу."""
+    rows = [
+        Suggestion(
+            user_id=user_id, author_id=author_id, score=score, mutual=common
+        )
+        for user_id in user_ids
+        for author_id, score, common in suggest(graph, user_id)
+    ]
+    Suggestion.objects.filter(user__in=user_ids).delete()
+    Suggestion.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    return len(rows)
+
+
+def refresh(user_ids):
+    """Пересчитывает рекомендации нескольких пользователей."""
+    return store(Graph.around(user_ids), list(user_ids))
+
+
+def rebuild():
+    """Полный пересчёт; каждая пачка пользователей — своя транзакция."""
+    prune()
+    graph = Graph.load()
+    total = 0
+    for batch in batches(sorted(graph.following), BATCH_SIZE):
+        with transaction.atomic():
+            total += store(graph, batch)
+    return total
+
+
+def prune():
+    """Удаляет рекомендации тех, кто ни на кого не подписан, и обновляет
+    список популярных авторов."""
+    Suggestion.objects.exclude(
+        user__in=Follow.objects.values('user')
+    ).delete()
+    cache.set(POPULAR_CACHE_KEY, popular_rows(), None)
+
+
+def popular_rows():
+    """Лучшие по числу подписчиков — по индексу, без обхода таблицы."""
+    return list(UserStats.objects.filter(followers_count__gt=0).order_by(
+        '-followers_count', 'pk'
+    ).values_list(
+        'user__pk', 'user__username', 'user__first_name', 'user__last_name'
+    )[:settings.RECOMMENDATIONS_SIZE])
+
+
+def popular():
+    """Самые популярные авторы для тех, у кого рекомендаций нет.
+
+    Список считает пакетное задание; если кеш его вытеснил, страница
+    собирает его заново.
+    """
+    rows = cache.get(POPULAR_CACHE_KEY)
+    if rows is None:
+        rows = popular_rows()
+        cache.set(POPULAR_CACHE_KEY, rows, None)
+    return [
+        User(pk=pk, username=username, first_name=first, last_name=last)
+        for pk, username, first, last in rows
+    ]
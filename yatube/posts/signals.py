@@ -0,0 +1,111 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from jobs.queue import enqueue
+from . import counters, follows, page_cache, tasks
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+# Поля пользователя, которые видны в карточках его постов.
+NAME_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+def renames(update_fields):
+    return update_fields is None or bool(NAME_FIELDS & set(update_fields))
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, update_fields=None, raw=False, **kwargs):
+    if instance.pk is not None and not raw and renames(update_fields):
+        page_cache.user_renaming(instance)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, raw=False,
+               **kwargs):
+    # Вход пользователя обновляет только last_login.
+    if update_fields != frozenset({'last_login'}):
+        page_cache.user_changed(instance)
+    if not created and not raw and renames(update_fields):
+        enqueue(tasks.author_renamed, instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    page_cache.user_changed(instance)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    page_cache.group_changed(instance)
+    if not created and not raw:
+        enqueue(tasks.group_renamed, instance.pk)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    page_cache.group_changed(instance)
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, raw=False, **kwargs):
+    if instance.pk is not None and not raw:
+        page_cache.post_moving(instance)
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.author_id, 'posts_count', 1)
+        enqueue(tasks.fan_out_post, instance.pk)
+    else:
+        enqueue(tasks.post_feeds_changed, instance.author_id)
+    page_cache.post_changed(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, 'posts_count', -1)
+    enqueue(tasks.post_feeds_changed, instance.author_id)
+    page_cache.post_changed(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_comments(instance.post_id, 1)
+    enqueue(tasks.post_feeds_changed, instance.post.author_id)
+    page_cache.comment_changed(instance.post)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_comments(instance.post_id, -1)
+    enqueue(tasks.post_feeds_changed, instance.post.author_id)
+    page_cache.comment_changed(instance.post)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.user_id, 'following_count', 1)
+        counters.bump_user(instance.author_id, 'followers_count', 1)
+        enqueue(tasks.follow_added, instance.user_id, instance.author_id)
+        follows.forget(instance.user_id)
+        page_cache.follow_changed(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    if follows.muted():
+        return
+    counters.bump_user(instance.user_id, 'following_count', -1)
+    counters.bump_user(instance.author_id, 'followers_count', -1)
+    enqueue(tasks.follow_removed, instance.user_id, instance.author_id)
+    follows.forget(instance.user_id)
+    page_cache.follow_changed(instance)
@@ -0,0 +1,93 @@
+"""Задачи очереди для побочных эффектов записей постов и подписок.
+
+Задачи сверяются с текущим состоянием БД: к моменту выполнения пост
+могли удалить, а подписку — отменить или вернуть.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+
+from core.cache import invalidate
+from jobs.queue import PRIORITY_HIGH, PRIORITY_LOW, enqueue, task
+from . import feed, page_cache, recommendations, trending
+from .bulk_load import batches
+from .models import Follow, Post
+
+
+@task(priority=PRIORITY_HIGH)
+def fan_out_post(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        return
+    feed.fan_out_post(post)
+    page_cache.feeds_changed(post.author_id)
+
+
+@task(priority=PRIORITY_HIGH)
+def post_feeds_changed(author_id):
+    """Сбрасывает ленты подписчиков после правки или удаления поста."""
+    page_cache.feeds_changed(author_id)
+
+
+@task(priority=PRIORITY_LOW)
+def author_renamed(author_id):
+    """Сбрасывает ленты, где карточки постов показывают имя автора."""
+    page_cache.author_renamed(author_id)
+
+
+@task(priority=PRIORITY_LOW)
+def group_renamed(group_id):
+    """Сбрасывает ленты, где карточки постов ссылаются на группу."""
+    page_cache.group_renamed(group_id)
+
+
+@task(priority=PRIORITY_HIGH)
+def follow_added(user_id, author_id):
+    feed.update_celebrity(author_id)
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        feed.backfill(user_id, author_id)
+    invalidate(f'feed:{user_id}')
+
+
+@task(priority=PRIORITY_HIGH)
+def follow_removed(user_id, author_id):
+    if not Follow.objects.filter(
+        user_id=user_id, author_id=author_id
+    ).exists():
+        feed.prune(user_id, author_id)
+    feed.update_celebrity(author_id)
+    invalidate(f'feed:{user_id}')
+
+
+@task(priority=PRIORITY_LOW)
+def refresh_suggestions(user_ids):
+    recommendations.refresh(user_ids)
+
+
+@task(priority=PRIORITY_LOW)
+def rebuild_suggestions():
+    """Периодический пересчёт рекомендаций пачками пользователей.
+
+    Каждая пачка — отдельная задача, чтобы не держать долгую транзакцию;
+    следующий запуск ставится через RECOMMENDATIONS_INTERVAL секунд.
+    """
+    recommendations.prune()
+    user_ids = Follow.objects.order_by('user').values_list(
+        'user', flat=True
+    ).distinct()
+    for batch in batches(user_ids.iterator(), recommendations.BATCH_SIZE):
+        enqueue(refresh_suggestions, batch)
+    if not settings.JOBS_EAGER:
+        enqueue(rebuild_suggestions, delay=timedelta(
+            seconds=settings.RECOMMENDATIONS_INTERVAL
+        ))
+
+
+@task(priority=PRIORITY_LOW)
+def rebuild_trending():
+    """Периодический пересчёт популярного раз в TRENDING_INTERVAL секунд."""
+    trending.rebuild()
+    if not settings.JOBS_EAGER:
+        enqueue(rebuild_trending, delay=timedelta(
+            seconds=settings.TRENDING_INTERVAL
+        ))
@@ -0,0 +1,27 @@
+from django import template
+from django.conf import settings
+
+from posts import image_variants, thumbnails
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(image, size='card'):
+    """Готовая миниатюра картинки поста или None, пока её нет."""
+    return thumbnails.cached_thumbnail(image, size)
+
+
+@register.simple_tag
+def post_image_sources(post):
+    """Источники <picture> по форматам. Ленты заранее подгружают
+    варианты (`for_feed`), закешированная карточка их не читает вовсе."""
+    if not post.image:
+        return []
+    return image_variants.sources(post)
+
+
+@register.simple_tag
+def post_image_sizes():
+    return settings.POST_IMAGE_SIZES
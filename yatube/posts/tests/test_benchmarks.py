@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+
+from .. import benchmarks
+from ..models import Comment, Follow, Group, Post, User
+
+METRICS = {
+    'p50_ms': 10.0, 'p95_ms': 20.0, 'queries': 5,
+    'sql_ms': 2.0, 'peak_mem_mb': 100.0,
+}
+
+
+class CompareTests(SimpleTestCase):
+    def test_timings_compared_with_threshold(self):
+        """Время сравнивается с допуском, число запросов — точно."""
+        baseline = {'results': {'index': METRICS}}
+        slower = {**METRICS, 'p50_ms': 11.0, 'p95_ms': 30.0, 'queries': 6}
+        regressions = benchmarks.compare(
+            baseline, {'index': slower}, threshold=0.2
+        )
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith('index.p95_ms'))
+        self.assertTrue(regressions[1].startswith('index.queries'))
+
+    def test_new_view_not_regression(self):
+        """Сценарий без базовых результатов не считается регрессией."""
+        self.assertEqual(
+            benchmarks.compare({'results': {}}, {'index': METRICS}, 0.2), []
+        )
+
+    def test_memory_peak_per_request(self):
+        """Пик памяти считается заново для каждого запроса."""
+        scenario = benchmarks.Scenario('get', '/')
+
+        def heavy(url, data):
+            return len(bytearray(20 * 1024 * 1024))
+
+        def light(url, data):
+            return None
+
+        self.assertGreater(benchmarks.peak_mem_mb(heavy, scenario), 19)
+        self.assertLess(benchmarks.peak_mem_mb(light, scenario), 1)
+
+
+class BenchViewsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Test_Bench_Author')
+        cls.reader = User.objects.create_user(username='Test_Bench_Reader')
+        group = Group.objects.create(title='Группа', slug='test-bench')
+        post = Post.objects.create(
+            author=cls.author, group=group, text='Тестовый пост'
+        )
+        Comment.objects.create(
+            post=post, author=cls.reader, text='Тестовый комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'baseline.json')
+
+    def bench(self, **options):
+        call_command(
+            'bench_views', iterations=2, warmup=1, stdout=StringIO(),
+            **options
+        )
+
+    def test_all_views_measured_without_writes(self):
+        """Замеряются все страницы, записи из замера откатываются."""
+        self.bench(save=self.path)
+        with open(self.path) as file:
+            report = json.load(file)
+        self.assertEqual(set(report['results']), {
+            'index', 'group_posts', 'profile', 'post_detail',
+            'follow_index', 'post_create', 'add_comment',
+        })
+        self.assertGreater(report['results']['post_detail']['queries'], 0)
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_regression_fails(self):
+        """Рост числа запросов относительно базовых результатов — ошибка."""
+        self.bench(only=['index'], save=self.path)
+        with open(self.path) as file:
+            report = json.load(file)
+        report['results']['index']['queries'] -= 1
+        with open(self.path, 'w') as file:
+            json.dump(report, file)
+        with self.assertRaisesMessage(CommandError, 'index.queries'):
+            self.bench(only=['index'], baseline=self.path)
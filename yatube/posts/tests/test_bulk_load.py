@@ -0,0 +1,118 @@
+import os
+import random
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+
+from .. import bulk_load
+from ..models import Comment, Follow, Post, TimelineEntry, User, UserStats
+
+SMALL = {
+    'users': 30, 'groups': 3, 'posts': 200, 'comments': 100,
+    'follows': 60, 'stdout': StringIO(),
+}
+
+
+class GeneratorTests(SimpleTestCase):
+    def test_seed_reproducible(self):
+        """Одинаковый seed даёт одинаковые данные."""
+        def sample(seed):
+            generator = bulk_load.Generator(seed=seed)
+            posts = generator.posts(20, range(1, 50), [1, 2])
+            return [(post.author_id, post.text) for post in posts]
+
+        self.assertEqual(sample(1), sample(1))
+        self.assertNotEqual(sample(1), sample(2))
+
+    def test_power_law(self):
+        """Самый популярный элемент выбирается много чаще среднего."""
+        sampler = bulk_load.ZipfSampler(range(1000), 1.2, random.Random(0))
+        counts = {}
+        for _ in range(10000):
+            item = sampler()
+            counts[item] = counts.get(item, 0) + 1
+        self.assertGreater(max(counts.values()), 100 * 10000 / 1000)
+
+
+class GenerateDataTests(TestCase):
+    def test_generated_with_derived_data(self):
+        """После генерации счётчики и ленты согласованы с данными."""
+        call_command('generate_data', keep_indexes=True, **SMALL)
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        stats = UserStats.objects.all()
+        self.assertEqual(sum(s.posts_count for s in stats), 200)
+        self.assertEqual(
+            sum(s.followers_count for s in stats), Follow.objects.count()
+        )
+        self.assertEqual(
+            TimelineEntry.objects.count(),
+            sum(
+                Post.objects.filter(author_id=author).count()
+                for author in Follow.objects.values_list('author', flat=True)
+            ),
+        )
+
+
+class ImportDataTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def test_import_streams_with_natural_keys(self):
+        """Ссылки разрешаются по username, неизвестные строки пропускаются."""
+        users = self.write(
+            'users.jsonl', '{"username": "a"}\n\n{"username": "b"}\n'
+        )
+        posts = self.write(
+            'posts.csv',
+            'id,author,text,pub_date\n'
+            '500,a,Старый пост,2020-01-01 10:00:00\n'
+            ',ghost,Пропуск,\n',
+        )
+        follows = self.write(
+            'follows.jsonl', '{"user": "b", "author": "a"}\n'
+        )
+        call_command(
+            'import_data', users=users, posts=posts, follows=follows,
+            keep_indexes=True, batch_size=1, stdout=StringIO(),
+        )
+        post = Post.objects.get()
+        self.assertEqual(post.pk, 500)
+        self.assertEqual(post.pub_date.year, 2020)
+        reader = User.objects.get(username='b')
+        self.assertEqual(
+            list(reader.timeline.values_list('post', flat=True)), [500]
+        )
+        self.assertEqual(Post.objects.create(author=post.author).pk, 501)
+
+
+class DeferredIndexesTests(TransactionTestCase):
+    def index_names(self):
+        with connection.cursor() as cursor:
+            return {
+                index.name
+                for index in Post._meta.indexes
+                if index.name in connection.introspection.get_constraints(
+                    cursor, Post._meta.db_table
+                )
+            }
+
+    def test_indexes_rebuilt_after_load(self):
+        """Снятые на время загрузки индексы строятся заново."""
+        with bulk_load.deferred_indexes():
+            self.assertEqual(self.index_names(), set())
+        self.assertEqual(
+            self.index_names(), {index.name for index in Post._meta.indexes}
+        )
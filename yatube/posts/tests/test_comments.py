@@ -0,0 +1,105 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import MAX_DEPTH, Comment, Post, User
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentThreadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Test_Thread_User')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client(REMOTE_ADDR='192.0.2.1')
+        self.client.force_login(self.user)
+
+    def comment(self, text, parent=None):
+        self.client.post(
+            reverse('posts:add_comment', args=(self.post.pk,)),
+            {'text': text, 'parent': parent.pk if parent else ''},
+        )
+        return Comment.objects.get(text=text)
+
+    def texts(self, comments):
+        return [comment.text for comment in comments]
+
+    def test_threads_newest_first_replies_in_order(self):
+        """Ветки идут от новых к старым, ответы — под своим комментарием."""
+        first = self.comment('первый')
+        second = self.comment('второй')
+        self.comment('ответ 1', parent=first)
+        self.comment('ответ 2', parent=first)
+        self.comment('ответ на ответ', parent=Comment.objects.get(
+            text='ответ 1'
+        ))
+        self.assertEqual(second.depth, 0)
+        self.assertEqual(
+            self.texts(Comment.objects.filter(post=self.post).threaded()),
+            ['второй', 'первый', 'ответ 1', 'ответ на ответ', 'ответ 2'],
+        )
+
+    def test_depth_limited(self):
+        """Ответ глубже предела прикрепляется к предку."""
+        parent = self.comment('0')
+        for depth in range(1, MAX_DEPTH + 2):
+            parent = self.comment(str(depth), parent=parent)
+        self.assertEqual(parent.depth, MAX_DEPTH)
+
+    def test_parent_from_other_post_ignored(self):
+        other = Post.objects.create(author=self.user, text='Другой пост')
+        foreign = Comment.objects.create(
+            post=other, author=self.user, text='чужой'
+        )
+        self.assertIsNone(self.comment('ответ', parent=foreign).parent)
+
+    def test_comments_loaded_by_pages(self):
+        """На странице поста первая страница, остальные — фрагментами."""
+        for i in range(5):
+            self.comment(f'комментарий {i}')
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        )
+        page = response.context['comments']
+        self.assertEqual(len(page), 3)
+        response = self.client.get(
+            reverse('posts:comment_list', args=(self.post.pk,)),
+            {'cursor': page.paginator.next_cursor},
+        )
+        self.assertEqual(
+            self.texts(response.context['comments']),
+            ['комментарий 1', 'комментарий 0'],
+        )
+        self.assertFalse(response.context['comments'].has_next())
+
+    def test_detail_queries_do_not_grow_with_comments(self):
+        """Число запросов страницы поста не зависит от числа комментариев."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.comment('один')
+        cache.clear()
+        with CaptureQueriesContext(connection) as one:
+            self.client.get(url)
+        for i in range(10):
+            Comment.objects.create(
+                post=self.post,
+                author=User.objects.create_user(username=f'Test_Thread_{i}'),
+                text=str(i),
+            )
+        cache.clear()
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(url)
+        self.assertEqual(len(many), len(one))
+
+    def test_bulk_inserted_comments_get_paths(self):
+        Comment.objects.bulk_create([
+            Comment(post=self.post, author=self.user, text='загружен')
+        ])
+        self.assertEqual(Comment.objects.fill_root_paths(), 1)
+        self.assertEqual(
+            self.texts(Comment.objects.threaded()), ['загружен']
+        )
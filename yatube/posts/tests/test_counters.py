@@ -0,0 +1,76 @@
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..models import Post, User, Comment, Follow, UserStats
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Test_Username')
+        cls.author = User.objects.create_user(username='Test_Author')
+        cls.post = Post.objects.create(author=cls.author, text='Тестовый пост')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_comment_updates_post_counter(self):
+        """Комментарий увеличивает comments_count, удаление уменьшает."""
+        self.authorized_client.post(
+            reverse('posts:add_comment', args=(self.post.pk,)),
+            data={'text': 'Комментарий'},
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        Comment.objects.get(post=self.post).delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_post_save_keeps_counter(self):
+        """Сохранение поста не затирает счётчик комментариев."""
+        stale = Post.objects.get(pk=self.post.pk)
+        Comment.objects.create(post=self.post, author=self.user, text='Ком')
+        stale.text = 'Новый текст'
+        stale.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(self.post.text, 'Новый текст')
+
+    def test_follow_updates_user_counters(self):
+        """Подписка и отписка меняют счётчики обоих пользователей."""
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=(self.author,))
+        )
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(
+            UserStats.objects.get(user=self.user).following_count, 1
+        )
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=(self.author,))
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).followers_count, 0
+        )
+
+    def test_recount_stats_repairs_drift(self):
+        """Команда recount_stats исправляет разошедшиеся счётчики."""
+        Follow.objects.create(user=self.user, author=self.author)
+        UserStats.objects.filter(user=self.author).update(
+            posts_count=100, followers_count=7
+        )
+        Post.objects.filter(pk=self.post.pk).update(comments_count=5)
+        UserStats.objects.filter(user=self.user).delete()
+        call_command('recount_stats', stdout=open('/dev/null', 'w'))
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(
+            UserStats.objects.get(user=self.user).following_count, 1
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from jobs import queue
+from ..models import Post, User, Follow, TimelineEntry
+
+
+class FollowFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Writer')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_new_post_fanned_out_to_followers(self):
+        """Новый пост попадает в материализованную ленту подписчика."""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists()
+        )
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), [post])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Подписка дозаполняет ленту, отписка очищает её."""
+        Post.objects.create(author=self.author, text='Старый пост')
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=(self.author,))
+        )
+        self.assertEqual(self.user.timeline.count(), 1)
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=(self.author,))
+        )
+        self.assertEqual(self.user.timeline.count(), 0)
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_celebrity_posts_read_on_demand(self):
+        """Посты популярного автора не раздаются, а читаются из ленты."""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост звезды')
+        self.assertFalse(TimelineEntry.objects.exists())
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), [post])
+
+    @override_settings(JOBS_EAGER=False)
+    def test_fan_out_deferred_to_worker(self):
+        """Раздача поста выполняется воркером очереди, а не в запросе."""
+        Follow.objects.create(user=self.user, author=self.author)
+        queue.work(burst=True)
+        post = Post.objects.create(author=self.author, text='Пост')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        queue.work(burst=True)
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), [post])
@@ -0,0 +1,81 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from jobs.models import Job
+from .. import follows, tasks
+from ..models import Follow, Post, TimelineEntry, User, UserStats
+
+
+class FollowServiceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Test_Graph_User')
+        cls.authors = [
+            User.objects.create_user(username=f'Test_Graph_Author_{i}')
+            for i in range(3)
+        ]
+        Post.objects.create(author=cls.authors[0], text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_follow_idempotent(self):
+        """Повторная подписка ничего не меняет, себя пропускаем."""
+        added = follows.follow(self.user, [*self.authors, self.user])
+        self.assertEqual(added, self.authors)
+        self.assertEqual(follows.follow(self.user, self.authors), [])
+        self.assertEqual(Follow.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(self.stats(self.user).following_count, 3)
+        self.assertEqual(self.stats(self.authors[0]).followers_count, 1)
+        self.assertTrue(TimelineEntry.objects.filter(user=self.user).exists())
+
+    def test_unfollow_idempotent(self):
+        follows.follow(self.user, self.authors)
+        removed = follows.unfollow(self.user, self.authors[:2])
+        self.assertEqual(removed, self.authors[:2])
+        self.assertEqual(follows.unfollow(self.user, self.authors[:2]), [])
+        self.assertEqual(self.stats(self.user).following_count, 1)
+        self.assertEqual(self.stats(self.authors[0]).followers_count, 0)
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+
+    @override_settings(JOBS_EAGER=False)
+    def test_unfollow_bookkeeping_once(self):
+        """Отписка ставит по одному заданию на автора: сигналы удаления
+        приглушены, учёт ведёт сервис."""
+        follows.follow(self.user, self.authors)
+        Job.objects.all().delete()
+        follows.unfollow(self.user, self.authors[:2])
+        self.assertEqual(
+            Job.objects.filter(name=tasks.follow_removed.job_name).count(), 2
+        )
+        self.assertEqual(self.stats(self.user).following_count, 1)
+        Follow.objects.filter(user=self.user).delete()
+        self.assertEqual(self.stats(self.user).following_count, 0)
+
+    def test_counters_shift_by_changed_rows(self):
+        """Счётчики сдвигаются на изменённые строки, подписчики автора
+        не пересчитываются."""
+        author = self.authors[0]
+        UserStats.objects.filter(user=author).update(followers_count=100)
+        follows.follow(self.user, self.authors[:2])
+        follows.follow(self.user, self.authors[:1])
+        self.assertEqual(self.stats(author).followers_count, 101)
+        self.assertEqual(self.stats(self.user).following_count, 2)
+        follows.unfollow(self.user, self.authors)
+        self.assertEqual(self.stats(author).followers_count, 100)
+        self.assertEqual(self.stats(self.user).following_count, 0)
+
+    def test_is_following_cached_and_dropped(self):
+        """Проверка подписки берётся из кеша, пока подписки не менялись."""
+        author = self.authors[0]
+        self.assertFalse(follows.is_following(self.user, author.pk))
+        # Единственный запрос — чтение из кеша в БД, без таблицы подписок.
+        with self.assertNumQueries(1):
+            self.assertFalse(follows.is_following(self.user, author.pk))
+        follows.follow(self.user, [author])
+        self.assertTrue(follows.is_following(self.user, author.pk))
+        Follow.objects.filter(user=self.user).delete()
+        self.assertFalse(follows.is_following(self.user, author.pk))
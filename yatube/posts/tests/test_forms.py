@@ -169,3 +169,61 @@ class PostCreateFormTests(TestCase):
             response.context["post"].comments.values()[0]["text"],
             form_data['text']
         )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Test_Uploader')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def post_image(self, content, name='upload.gif'):
+        return self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Пост с загрузкой',
+                'image': SimpleUploadedFile(name=name, content=content),
+            },
+        )
+
+    def test_non_image_rejected_by_signature(self):
+        """Файл без сигнатуры картинки отклоняется при загрузке."""
+        response = self.post_image(b'#!/bin/sh\necho not an image\n')
+        self.assertFormError(
+            response, 'form', 'image',
+            'Загрузите изображение в формате JPEG, PNG, GIF или WebP.'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_UPLOAD_SIZE=16)
+    def test_oversize_upload_rejected(self):
+        """Файл больше лимита отклоняется, не дожидаясь конца загрузки."""
+        response = self.post_image(b'GIF89a' + b'\x00' * 64)
+        self.assertFalse(response.context['form'].is_valid())
+        self.assertIn('image', response.context['form'].errors)
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=1)
+    def test_resolution_checked_from_header(self):
+        """Разрешение сверяется с лимитом по заголовку картинки."""
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        response = self.post_image(small_gif)
+        self.assertFormError(
+            response, 'form', 'image',
+            'Слишком большое разрешение картинки: 2×1.'
+        )
@@ -0,0 +1,121 @@
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Writer')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Первый пост'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_new_post_invalidates_feeds(self):
+        """Новый пост сбрасывает главную, группу, профиль и ленту."""
+        Follow.objects.create(user=self.user, author=self.author)
+        urls = (
+            (self.guest_client, reverse('posts:index')),
+            (
+                self.guest_client,
+                reverse('posts:group_list', args=('test_slug',)),
+            ),
+            (self.guest_client, reverse('posts:profile', args=('Writer',))),
+            (self.authorized_client, reverse('posts:follow_index')),
+        )
+        for client, url in urls:
+            client.get(url)
+            self.assertEqual(client.get(url)['X-Cache'], 'HIT')
+        Post.objects.create(
+            author=self.author, group=self.group, text='Второй пост'
+        )
+        for client, url in urls:
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertEqual(response['X-Cache'], 'MISS')
+                self.assertContains(response, 'Второй пост')
+
+    def test_follow_button_personal_on_cached_profile(self):
+        """Кнопка подписки в закешированном профиле своя у каждого."""
+        url = reverse('posts:profile', args=('Writer',))
+        self.guest_client.get(url)
+        Follow.objects.filter(user=self.user, author=self.author).delete()
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'Подписаться')
+        Follow.objects.create(user=self.user, author=self.author)
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'Отписаться')
+        response = self.guest_client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertContains(response, 'Подписаться')
+
+    def test_comment_form_only_for_authorized(self):
+        """Форма комментария подставляется только авторизованным."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.assertNotContains(self.guest_client.get(url), '<form')
+        response = self.authorized_client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertContains(response, 'csrfmiddlewaretoken')
+
+    def test_comment_resets_feeds_with_counter(self):
+        """Комментарий меняет счётчик в карточках: главная и ленты
+        подписчиков пересобираются, старый ETag не даёт 304."""
+        Follow.objects.create(user=self.user, author=self.author)
+        urls = (reverse('posts:index'), reverse('posts:follow_index'))
+        etags = {url: self.authorized_client.get(url)['ETag'] for url in urls}
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertEqual(response['X-Cache'], 'MISS')
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_edit_resets_follower_feeds(self):
+        """Правка поста сбрасывает ленты подписчиков заданием."""
+        Follow.objects.create(user=self.user, author=self.author)
+        url = reverse('posts:follow_index')
+        self.authorized_client.get(url)
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        response = self.authorized_client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertContains(response, 'Исправленный пост')
+
+    def test_renames_refresh_cards(self):
+        """Новое имя автора и адрес группы попадают в карточки лент."""
+        Follow.objects.create(user=self.user, author=self.author)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=('Writer',)),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            self.authorized_client.get(url)
+        self.author.first_name = 'Переименованный'
+        self.author.save()
+        self.group.slug = 'renamed_slug'
+        self.group.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, 'Переименованный')
+                self.assertContains(response, 'renamed_slug')
@@ -0,0 +1,99 @@
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import trending
+from ..models import Comment, Follow, Group, Post, User
+
+# Полный проход по таблице без индекса и сортировка во временном B-дереве.
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\w+( AS \w+)?$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'template_fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'query-plans',
+    },
+})
+class QueryPlanTests(TestCase):
+    """Запросы лент читают страницу по индексу, без сортировки."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Test_Plan_Reader')
+        cls.author = User.objects.create_user(username='Test_Plan_Author')
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+        cls.group = Group.objects.create(
+            title='Тестовая группа планов',
+            slug='plan_slug',
+            description='Тестовый дескрипшн'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(settings.COUNT_OF_MESSAGES + 2):
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Тестовый пост {i}'
+            )
+        cls.post = Post.objects.first()
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text='Тестовый комментарий'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def query_plans(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.authorized_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {query["sql"]}')
+                yield query['sql'], [row[-1] for row in cursor.fetchall()]
+
+    def assert_indexed(self, url):
+        for sql, plan in self.query_plans(url):
+            for step in plan:
+                with self.subTest(url=url, sql=sql, step=step):
+                    self.assertIsNone(FULL_SCAN.match(step))
+                    self.assertNotIn(TEMP_SORT, step)
+
+    def test_feed_views_use_indexes(self):
+        """Ленты, пост и комментарии не сканируют и не сортируют таблицы."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            self.assert_indexed(url)
+
+    def test_trending_uses_indexes(self):
+        """Популярное читает готовый рейтинг по индексу мест."""
+        trending.rebuild()
+        self.assert_indexed(reverse('posts:trending'))
+
+    def test_next_pages_use_indexes(self):
+        """Переход по курсору тоже идёт по индексу."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            response = self.authorized_client.get(url)
+            cursor = response.context['page_obj'].paginator.next_cursor
+            self.assert_indexed(f'{url}?cursor={cursor}')
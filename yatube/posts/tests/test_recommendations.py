@@ -0,0 +1,105 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from jobs.models import Job
+from .. import follows, recommendations
+from ..models import Follow, Suggestion, User
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {
+            name: User.objects.create_user(username=f'Test_Rec_{name}')
+            for name in ('reader', 'a', 'b', 'c', 'd', 'fan')
+        }
+        for user, author in (
+            ('reader', 'a'), ('reader', 'b'),
+            ('a', 'c'), ('b', 'c'), ('a', 'd'),
+            ('fan', 'a'), ('fan', 'd'),
+        ):
+            Follow.objects.create(
+                user=cls.users[user], author=cls.users[author]
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def suggested(self, user):
+        return list(Suggestion.objects.filter(
+            user=self.users[user]
+        ).values_list('author__username', 'mutual'))
+
+    def test_friends_of_friends_ranked(self):
+        """Кандидат, на которого подписано больше подписок, выше."""
+        recommendations.rebuild()
+        self.assertEqual(
+            self.suggested('reader'), [('Test_Rec_c', 2), ('Test_Rec_d', 1)]
+        )
+
+    def test_cofollow_without_common_authors(self):
+        """Похожая аудитория рекомендует и без цепочки подписок."""
+        recommendations.rebuild()
+        self.assertIn(('Test_Rec_d', 0), self.suggested('b'))
+
+    def test_refresh_matches_rebuild(self):
+        """Точечный пересчёт по окрестности совпадает с полным."""
+        recommendations.rebuild()
+        full = self.suggested('reader')
+        Suggestion.objects.all().delete()
+        recommendations.refresh([self.users['reader'].pk])
+        self.assertEqual(self.suggested('reader'), full)
+
+    def test_follow_updates_suggestions(self):
+        """Подписка убирает автора из рекомендаций и пересчитывает их."""
+        recommendations.rebuild()
+        follows.follow(self.users['reader'], [self.users['c']])
+        self.assertNotIn(
+            'Test_Rec_c', dict(self.suggested('reader'))
+        )
+
+    def test_widget_on_follow_index(self):
+        recommendations.rebuild()
+        client = Client()
+        client.force_login(self.users['reader'])
+        response = client.get(reverse('posts:follow_index'))
+        self.assertContains(response, 'На кого подписаться')
+        self.assertContains(
+            response, reverse('posts:profile_follow', args=('Test_Rec_c',))
+        )
+
+    def test_popular_fallback(self):
+        """Без рекомендаций показываются популярные авторы."""
+        newcomer = User.objects.create_user(username='Test_Rec_New')
+        recommendations.rebuild()
+        client = Client()
+        client.force_login(newcomer)
+        response = client.get(
+            reverse('posts:profile', args=(newcomer.username,))
+        )
+        self.assertContains(
+            response, reverse('posts:profile_follow', args=('Test_Rec_a',))
+        )
+
+    def test_popular_rebuilt_after_eviction(self):
+        """Вытесненный из кеша список популярных собирается заново."""
+        recommendations.rebuild()
+        cache.delete(recommendations.POPULAR_CACHE_KEY)
+        self.assertIn(
+            'Test_Rec_a',
+            [author.username for author in recommendations.popular()],
+        )
+        with self.assertNumQueries(1):
+            recommendations.popular()
+
+    @override_settings(JOBS_EAGER=False)
+    def test_schedule_once(self):
+        for _ in range(2):
+            call_command(
+                'rebuild_recommendations', schedule=True, stdout=StringIO()
+            )
+        self.assertEqual(Job.objects.count(), 1)
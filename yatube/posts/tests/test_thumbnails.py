@@ -0,0 +1,144 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from .. import thumbnails
+from ..models import Post, User
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, JOBS_EAGER=True)
+class ThumbnailPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Test_Username')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # Пайплайн перезаписывает файл картинки, поэтому пост у каждого
+        # теста свой.
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='small.gif', content=SMALL_GIF, content_type='image/gif'
+            ),
+        )
+        self.guest_client = Client()
+        self.url = reverse('posts:post_detail', args=(self.post.pk,))
+
+    def test_placeholder_until_thumbnail_ready(self):
+        """До генерации выводится заглушка, после — миниатюра."""
+        response = self.guest_client.get(self.url)
+        self.assertContains(response, 'aspect-ratio: 960 / 339')
+        self.assertNotContains(response, '<img class="card-img')
+        thumbnails.generate(self.post.pk)
+        self.post.refresh_from_db()
+        self.assertIsNotNone(
+            thumbnails.cached_thumbnail(self.post.image, 'card')
+        )
+        response = self.guest_client.get(self.url)
+        self.assertContains(response, '<img class="card-img')
+
+    def test_generate_bumps_card_version(self):
+        """Готовая миниатюра сдвигает версию закешированной карточки."""
+        updated_at = Post.objects.get(pk=self.post.pk).updated_at
+        thumbnails.generate(self.post.pk)
+        self.assertGreater(
+            Post.objects.get(pk=self.post.pk).updated_at, updated_at
+        )
+
+    def test_generate_builds_responsive_variants(self):
+        """Для картинки строятся варианты WebP не шире неё и выводится
+        srcset."""
+        buffer = BytesIO()
+        Image.new('RGB', (1000, 500), 'red').save(buffer, 'PNG')
+        self.post.image = SimpleUploadedFile(
+            name='wide.png', content=buffer.getvalue()
+        )
+        self.post.save()
+        thumbnails.generate(self.post.pk)
+        variants = self.post.image_variants.all()
+        self.assertTrue(variants.filter(format='WEBP').exists())
+        for variant in variants:
+            with self.subTest(variant=variant):
+                self.assertEqual(variant.size, variant.image.size)
+        self.assertEqual(
+            sorted({variant.width for variant in variants}), [480, 960]
+        )
+        response = self.guest_client.get(self.url)
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, '480w')
+        self.assertContains(response, '960w')
+
+    def test_tiny_image_not_upscaled(self):
+        """Картинка уже самого узкого варианта остаётся своей ширины."""
+        thumbnails.generate(self.post.pk)
+        for variant in self.post.image_variants.all():
+            with self.subTest(variant=variant):
+                self.assertEqual(variant.width, 2)
+
+    def test_feed_reads_variants_once(self):
+        """Варианты картинок всех карточек ленты читаются одним запросом."""
+        other = Post.objects.create(
+            author=self.user,
+            text='Ещё пост с картинкой',
+            image=SimpleUploadedFile(
+                name='other.gif', content=SMALL_GIF, content_type='image/gif'
+            ),
+        )
+        for post in (self.post, other):
+            thumbnails.generate(post.pk)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'type="image/webp"', count=2)
+        self.assertEqual(len([
+            query for query in queries
+            if 'posts_postimagevariant' in query['sql']
+        ]), 1)
+
+    @override_settings(POST_IMAGE_MAX_SIDE=4)
+    def test_generate_strips_exif_and_downscales(self):
+        """Пайплайн удаляет EXIF и уменьшает картинку до лимита."""
+        buffer = BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        Image.new('RGB', (8, 6), 'red').save(buffer, 'JPEG', exif=exif)
+        post = Post.objects.create(
+            author=self.user,
+            text='Фото',
+            image=SimpleUploadedFile(
+                name='photo.jpg', content=buffer.getvalue()
+            ),
+        )
+        thumbnails.generate(post.pk)
+        post.refresh_from_db()
+        with Image.open(post.image) as image:
+            self.assertEqual(image.size, (4, 3))
+            self.assertFalse(image.getexif())
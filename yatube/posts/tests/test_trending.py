@@ -0,0 +1,135 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from jobs.models import Job
+from .. import trending, view_counts
+from ..models import (
+    Comment, Follow, Group, Post, TrendingPost, User, ViewBatch
+)
+
+
+@override_settings(TRENDING_HALF_LIFE=6 * 60 * 60)
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Test_Trend_Author')
+        cls.reader = User.objects.create_user(username='Test_Trend_Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа популярного',
+            slug='trend_slug',
+            description='Тестовый дескрипшн'
+        )
+        cls.quiet_group = Group.objects.create(
+            title='Тихая группа',
+            slug='quiet_slug',
+            description='Тестовый дескрипшн'
+        )
+        cls.hot, cls.cooling, cls.quiet = (
+            Post.objects.create(author=cls.author, group=group, text=text)
+            for text, group in (
+                ('Горячий пост', cls.group),
+                ('Остывающий пост', cls.quiet_group),
+                ('Тихий пост', None),
+            )
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+
+    def comment(self, post, age, count=1):
+        for _ in range(count):
+            comment = Comment.objects.create(
+                post=post, author=self.reader, text='Тестовый комментарий'
+            )
+            Comment.objects.filter(pk=comment.pk).update(
+                created=self.now - age
+            )
+
+    def test_decay_halves_weight(self):
+        """Комментарий возрастом в период полураспада весит половину."""
+        self.comment(self.hot, timedelta(hours=6))
+        self.assertAlmostEqual(
+            trending.scores(self.now)[self.hot.pk], 0.5
+        )
+
+    def test_recent_comments_rank_higher(self):
+        """Свежие комментарии важнее старых; без активности поста нет."""
+        self.comment(self.hot, timedelta(hours=1), count=3)
+        self.comment(self.cooling, timedelta(hours=24), count=3)
+        self.comment(self.quiet, timedelta(days=5), count=10)
+        trending.rebuild(self.now)
+        self.assertEqual(
+            list(TrendingPost.objects.values_list('post', 'rank')),
+            [(self.hot.pk, 1), (self.cooling.pk, 2)],
+        )
+
+    def test_new_followers_boost_recent_posts(self):
+        """Новые подписчики поднимают свежие посты автора, старые — нет."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        old = User.objects.create_user(username='Test_Trend_Old')
+        Follow.objects.create(user=old, author=self.author)
+        Follow.objects.filter(user=old).update(created=None)
+        scores = trending.scores(timezone.now())
+        self.assertEqual(
+            set(scores), {self.hot.pk, self.cooling.pk, self.quiet.pk}
+        )
+        self.assertAlmostEqual(scores[self.hot.pk], 2.0, delta=0.3)
+
+    def test_views_rank_viewed_post_higher(self):
+        """Просмотренный пост выше непросмотренного; старые сбросы
+        пересчёт не учитывает и удаляет."""
+        view_counts.record(self.quiet.pk, 400)
+        view_counts.flush()
+        ViewBatch.objects.update(created=self.now - timedelta(days=5))
+        view_counts.record(self.cooling.pk, 200)
+        view_counts.flush()
+        self.comment(self.hot, timedelta(hours=1))
+        trending.rebuild(self.now)
+        self.assertEqual(
+            list(TrendingPost.objects.values_list('post', 'rank')),
+            [(self.cooling.pk, 1), (self.hot.pk, 2)],
+        )
+        self.assertEqual(
+            list(ViewBatch.objects.values_list('post', 'views')),
+            [(self.cooling.pk, 200)],
+        )
+
+    def test_trending_page_reads_rankings(self):
+        self.comment(self.cooling, timedelta(hours=1), count=3)
+        self.comment(self.hot, timedelta(hours=1))
+        trending.rebuild(self.now)
+        response = Client().get(reverse('posts:trending'))
+        self.assertEqual(
+            list(response.context['page_obj']), [self.cooling, self.hot]
+        )
+        self.assertEqual(
+            [group.slug for group in response.context['trending_groups']],
+            ['quiet_slug', 'trend_slug'],
+        )
+
+    def test_rebuild_refreshes_index_sidebar(self):
+        """Пересчёт сбрасывает главную, хотя посты не менялись."""
+        client = Client()
+        self.assertNotContains(
+            client.get(reverse('posts:index')), 'Популярные группы'
+        )
+        self.comment(self.hot, timedelta(hours=1))
+        trending.rebuild(self.now)
+        response = client.get(reverse('posts:index'))
+        self.assertContains(response, 'Популярные группы')
+        self.assertContains(
+            response, reverse('posts:group_list', args=('trend_slug',))
+        )
+
+    @override_settings(JOBS_EAGER=False)
+    def test_schedule_once(self):
+        for _ in range(2):
+            call_command('rebuild_trending', schedule=True, stdout=StringIO())
+        self.assertEqual(Job.objects.count(), 1)
@@ -0,0 +1,106 @@
+from unittest import mock
+
+from django.apps import apps
+from django.db import DatabaseError
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import view_counts
+from ..models import Post, User
+
+
+class ViewCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Test_Views_Author')
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=f'Тестовый пост {i}')
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        # Буфер общий на процесс: убираем просмотры из других тестов.
+        view_counts._take()
+
+    def views(self):
+        return list(Post.objects.filter(
+            pk__in=[post.pk for post in self.posts]
+        ).order_by('pk').values_list('views_count', flat=True))
+
+    def test_flush_adds_buffered_views(self):
+        """Просмотры копятся в памяти и записываются суммами."""
+        for post, views in zip(self.posts, (3, 1, 0)):
+            for _ in range(views):
+                view_counts.record(post.pk)
+        self.assertEqual(self.views(), [0, 0, 0])
+        self.assertEqual(view_counts.flush(), 2)
+        self.assertEqual(self.views(), [3, 1, 0])
+        self.assertEqual(view_counts.pending(), {})
+
+    def test_flush_in_batches(self):
+        with mock.patch.object(view_counts, 'BATCH_SIZE', 2):
+            for post in self.posts:
+                view_counts.record(post.pk, views=5)
+            view_counts.flush()
+        self.assertEqual(self.views(), [5, 5, 5])
+
+    def test_failed_flush_keeps_views(self):
+        """Неудачный сброс возвращает суммы в буфер."""
+        view_counts.record(self.posts[0].pk, views=2)
+        with mock.patch.object(
+            view_counts, 'write', side_effect=DatabaseError
+        ), self.assertLogs('posts.view_counts'):
+            self.assertEqual(view_counts.flush(), 0)
+        view_counts.record(self.posts[0].pk)
+        self.assertEqual(view_counts.pending(), {self.posts[0].pk: 3})
+
+    def test_flush_registered_at_exit(self):
+        """Остаток буфера сбрасывается при выходе, если это включено."""
+        config = apps.get_app_config('posts')
+        for enabled in (True, False):
+            with self.subTest(enabled=enabled), override_settings(
+                VIEWS_FLUSH_AT_EXIT=enabled
+            ), mock.patch('atexit.register') as register:
+                config.ready()
+            self.assertEqual(register.called, enabled)
+            if enabled:
+                register.assert_called_once_with(view_counts.flush)
+
+    def test_post_detail_counts_cached_and_not_modified(self):
+        """Просмотр засчитывается и для ответа из кеша, и для 304."""
+        url = reverse('posts:post_detail', args=(self.posts[0].pk,))
+        client = Client()
+        etag = client.get(url)['ETag']
+        client.get(url)
+        self.assertEqual(
+            client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        client.post(url)
+        self.assertEqual(view_counts.pending(), {self.posts[0].pk: 3})
+
+    @override_settings(VIEWS_FLUSH_SIZE=1)
+    def test_not_flushed_inside_transaction(self):
+        """Сигнал не пишет из открытой транзакции (здесь — теста)."""
+        view_counts.record(self.posts[0].pk)
+        self.assertTrue(view_counts.due())
+        view_counts.flush_if_due()
+        self.assertEqual(self.views(), [0, 0, 0])
+
+    def test_shown_on_post_page(self):
+        Post.objects.filter(pk=self.posts[0].pk).update(views_count=42)
+        response = Client().get(
+            reverse('posts:post_detail', args=(self.posts[0].pk,))
+        )
+        self.assertContains(response, 'Просмотров: 42')
+
+    def test_count_fresh_on_cached_page(self):
+        """Каркас из кеша и 304 не замораживают счётчик просмотров."""
+        url = reverse('posts:post_detail', args=(self.posts[0].pk,))
+        client = Client()
+        etag = client.get(url)['ETag']
+        view_counts.record(self.posts[0].pk, views=4)
+        view_counts.flush()
+        self.assertContains(client.get(url), 'Просмотров: 5')
+        self.assertEqual(
+            client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200
+        )
@@ -0,0 +1,76 @@
+"""Фоновая генерация миниатюр картинок постов.
+
+Миниатюры всех размеров из `POST_THUMBNAILS` строятся задачей очереди
+сразу после сохранения картинки. Шаблоны только ищут готовую миниатюру
+в kvstore sorl-thumbnail и, пока её нет, выводят заглушку, так что
+ни один запрос страницы не декодирует и не масштабирует картинки.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from jobs.queue import PRIORITY_LOW, enqueue, task
+from . import image_variants, page_cache, uploads
+from .models import Post
+
+
+class LookupBackend(ThumbnailBackend):
+    """Бэкенд sorl-thumbnail, который умеет только искать миниатюру."""
+
+    def _normalize_options(self, source, options):
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return options
+
+    def get_cached_thumbnail(self, file_, geometry_string, **options):
+        source = ImageFile(file_)
+        options = self._normalize_options(source, options)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+lookup_backend = LookupBackend()
+
+
+def cached_thumbnail(image, size):
+    """Готовая миниатюра размера `size` или None."""
+    if not image:
+        return None
+    geometry, options = settings.POST_THUMBNAILS[size]
+    return lookup_backend.get_cached_thumbnail(image, geometry, **options)
+
+
+@task(priority=PRIORITY_LOW)
+def generate(post_id):
+    """Нормализует картинку поста, строит её миниатюры и адаптивные
+    варианты, сдвигает версию карточки поста и сбрасывает страницы
+    с ним."""
+    post = Post.objects.filter(pk=post_id).only('image').first()
+    if post is None:
+        return
+    uploads.normalize(post)
+    image_variants.build(post)
+    if not post.image:
+        return
+    for geometry, options in settings.POST_THUMBNAILS.values():
+        default.backend.get_thumbnail(post.image, geometry, **options)
+    Post.objects.filter(pk=post_id).update(updated_at=timezone.now())
+    post = Post.objects.select_related('author', 'group').get(pk=post_id)
+    page_cache.post_changed(post)
+    page_cache.feeds_changed(post.author_id)
+
+
+def schedule(post):
+    """Ставит генерацию миниатюр в очередь после коммита транзакции."""
+    transaction.on_commit(lambda: enqueue(generate, post.pk))
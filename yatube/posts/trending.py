@@ -0,0 +1,156 @@
+"""Популярное: посты и группы, вокруг которых сейчас больше активности.
+
+Вес поста — сумма событий за окно `TRENDING_WINDOW`, каждое из которых
+теряет половину веса за `TRENDING_HALF_LIFE`:
+
+* комментарии к посту (`TRENDING_COMMENT_WEIGHT`);
+* просмотры поста (`TRENDING_VIEW_WEIGHT` за просмотр) — по строкам
+  `ViewBatch`, которые оставляет сброс буфера просмотров; датой события
+  считается время сброса;
+* новые подписчики автора (`TRENDING_FOLLOWER_WEIGHT`) — достаются его
+  постам, опубликованным за окно.
+
+События за окно читаются по покрывающим индексам дат, поэтому пересчёт
+стоит столько, сколько было активности за окно, а не сколько всего
+строк в таблицах. Строки просмотров старше окна пересчёт удаляет.
+Вес группы — сумма весов её постов.
+
+Пересчёт выполняет периодическое задание: `TRENDING_SIZE` лучших постов
+ложатся с местами в таблицу `TrendingPost`, рейтинг групп — в кеш.
+Страницы только читают готовое.
+"""
+import heapq
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.cache import invalidate
+from .bulk_load import batches
+from .models import Comment, Follow, Group, Post, TrendingPost, ViewBatch
+
+BATCH_SIZE = 500
+CACHE_KEY = 'trending:groups'
+
+
+def decay(age):
+    """Доля веса события возраста `age`."""
+    return 0.5 ** (age.total_seconds() / settings.TRENDING_HALF_LIFE)
+
+
+def decayed(queryset, field, key, now, count=None):
+    """Затухшие суммы событий запроса по значениям `key`.
+
+    С `count` строка считается за столько событий, сколько в этом поле.
+    """
+    # Без GROUP BY: с ним SQLite выбирает индекс по `key` и читает
+    # таблицу целиком вместо окна по индексу дат.
+    columns = [key, field, count] if count else [key, field]
+    rows = queryset.order_by().values_list(*columns)
+    totals = defaultdict(float)
+    for value, created, *events in rows.iterator():
+        weight = decay(max(now - created, timedelta()))
+        totals[value] += weight * (events[0] if events else 1)
+    return totals
+
+
+def scores(now=None):
+    """Веса всех постов с активностью за окно."""
+    now = now or timezone.now()
+    since = now - timedelta(seconds=settings.TRENDING_WINDOW)
+    result = defaultdict(float)
+    comments = decayed(
+        Comment.objects.filter(created__gte=since), 'created', 'post', now
+    )
+    for post_id, weight in comments.items():
+        result[post_id] += settings.TRENDING_COMMENT_WEIGHT * weight
+    views = decayed(
+        ViewBatch.objects.filter(created__gte=since),
+        'created', 'post', now, count='views'
+    )
+    for post_id, weight in views.items():
+        result[post_id] += settings.TRENDING_VIEW_WEIGHT * weight
+    followers = decayed(
+        Follow.objects.filter(created__gte=since), 'created', 'author', now
+    )
+    for batch in batches(followers, BATCH_SIZE):
+        recent = Post.objects.filter(
+            author__in=batch, pub_date__gte=since
+        ).order_by().values_list('pk', 'author')
+        for post_id, author_id in recent:
+            result[post_id] += (
+                settings.TRENDING_FOLLOWER_WEIGHT * followers[author_id]
+            )
+    return result
+
+
+def group_scores(post_scores):
+    """Веса групп: суммы весов их постов."""
+    result = defaultdict(float)
+    for batch in batches(post_scores, BATCH_SIZE):
+        rows = Post.objects.filter(
+            pk__in=batch, group__isnull=False
+        ).order_by().values_list('pk', 'group')
+        for post_id, group_id in rows:
+            result[group_id] += post_scores[post_id]
+    return result
+
+
+def best(weights, size):
+    """Лучшие `size` пар (id, вес); при равенстве выше более новый id."""
+    return heapq.nlargest(size, weights.items(), key=lambda item: (
+        item[1], item[0]
+    ))
+
+
+def rebuild(now=None):
+    """Пересчитывает рейтинги и сбрасывает страницы, которые их показывают."""
+    now = now or timezone.now()
+    since = now - timedelta(seconds=settings.TRENDING_WINDOW)
+    ViewBatch.objects.filter(created__lt=since).delete()
+    post_scores = scores(now)
+    top = best(post_scores, settings.TRENDING_SIZE)
+    with transaction.atomic():
+        TrendingPost.objects.all().delete()
+        TrendingPost.objects.bulk_create(
+            [
+                TrendingPost(post_id=post_id, rank=rank, score=score)
+                for rank, (post_id, score) in enumerate(top, 1)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+    ranked = best(group_scores(post_scores), settings.TRENDING_GROUPS_SHOWN)
+    titles = {
+        pk: (slug, title) for pk, slug, title in Group.objects.filter(
+            pk__in=[pk for pk, _ in ranked]
+        ).values_list('pk', 'slug', 'title')
+    }
+    cache.set(CACHE_KEY, (now, [
+        (pk, *titles[pk]) for pk, _ in ranked if pk in titles
+    ]), None)
+    invalidate('trending')
+    return len(top)
+
+
+def posts():
+    """Популярные посты в порядке мест."""
+    return Post.objects.for_feed().annotate(
+        rank=F('trending__rank')
+    ).filter(rank__isnull=False).order_by('rank')
+
+
+def computed_at():
+    """Когда рейтинги пересчитывались в последний раз (или None)."""
+    return cache.get(CACHE_KEY, (None, ()))[0]
+
+
+def groups():
+    """Популярные группы; список считает задание, здесь — только кеш."""
+    _, ranked = cache.get(CACHE_KEY, (None, ()))
+    return [
+        Group(pk=pk, slug=slug, title=title) for pk, slug, title in ranked
+    ]
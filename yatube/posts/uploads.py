@@ -0,0 +1,96 @@
+"""Потоковая проверка и нормализация загружаемых картинок.
+
+`ImageUploadHandler` стоит первым в `FILE_UPLOAD_HANDLERS` и проверяет
+файл прямо в потоке запроса: сигнатуру формата по первым байтам и
+размер по мере поступления данных. Непрошедший проверку файл дальше не
+буферизуется, а причина отказа сохраняется в `request.upload_errors`
+и выводится формой. Размеры картинки форма проверяет по заголовку, без
+полного декодирования; удаление EXIF и уменьшение до
+`POST_IMAGE_MAX_SIDE` выполняются позже, в фоновом пайплайне миниатюр.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+from .models import Post
+
+SIGNATURES = (
+    (0, b'\xff\xd8\xff'),
+    (0, b'\x89PNG\r\n\x1a\n'),
+    (0, b'GIF87a'),
+    (0, b'GIF89a'),
+    (8, b'WEBP'),
+)
+
+
+def has_image_signature(header):
+    return any(
+        header[offset:offset + len(signature)] == signature
+        for offset, signature in SIGNATURES
+    )
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """Отбрасывает слишком большие файлы и файлы не-картинки на лету."""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        limit = settings.POST_IMAGE_MAX_UPLOAD_SIZE
+        if self.content_length and self.content_length > limit:
+            self.reject(self.too_large_message())
+
+    def receive_data_chunk(self, raw_data, start):
+        if start == 0 and not has_image_signature(raw_data[:16]):
+            self.reject(
+                'Загрузите изображение в формате JPEG, PNG, GIF или WebP.'
+            )
+        self.received += len(raw_data)
+        if self.received > settings.POST_IMAGE_MAX_UPLOAD_SIZE:
+            self.reject(self.too_large_message())
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+    def too_large_message(self):
+        limit = filesizeformat(settings.POST_IMAGE_MAX_UPLOAD_SIZE)
+        return f'Файл больше допустимых {limit}.'
+
+    def reject(self, message):
+        if self.request is not None:
+            if not hasattr(self.request, 'upload_errors'):
+                self.request.upload_errors = {}
+            self.request.upload_errors[self.field_name] = message
+        raise SkipFile(message)
+
+
+def normalize(post):
+    """Убирает EXIF и уменьшает картинку до `POST_IMAGE_MAX_SIDE`.
+
+    Анимированные картинки не трогаем, чтобы не потерять кадры.
+    """
+    if not post.image:
+        return
+    with Image.open(post.image) as source:
+        if getattr(source, 'is_animated', False):
+            return
+        image_format = source.format
+        image = ImageOps.exif_transpose(source)
+        image.thumbnail(
+            (settings.POST_IMAGE_MAX_SIDE, settings.POST_IMAGE_MAX_SIDE),
+            Image.LANCZOS,
+        )
+        buffer = BytesIO()
+        image.save(buffer, image_format, quality=settings.POST_IMAGE_QUALITY)
+    old_name = post.image.name
+    post.image.save(
+        os.path.basename(old_name), ContentFile(buffer.getvalue()), save=False
+    )
+    post.image.storage.delete(old_name)
+    Post.objects.filter(pk=post.pk).update(image=post.image.name)
@@ -1,7 +1,184 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+
+CURSOR_PARAM = 'cursor'
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class BaseCursorPaginator(Paginator):
+    """Общая часть курсорной (keyset) паджинации.
+
+    Курсор — непрозрачная base64-строка со значениями ключа сортировки
+    крайней записи страницы и направлением перехода. Подклассы
+    определяют, как достать значения ключа из записи (`cursor_values`),
+    как разобрать их из курсора (`parse_values`) и как выбрать записи
+    строго после курсора (`fetch`).
+
+    Паджинатор одноразовый: после `get_page()` в нём лежат курсоры
+    соседних страниц, а `number`/`num_pages` страницы подобраны так,
+    чтобы стандартные `has_next`/`has_previous` у `Page` работали.
+    """
+
+    is_cursor = True
+
+    def __init__(self, object_list, per_page):
+        super().__init__(object_list, per_page)
+        self.next_cursor = None
+        self.previous_cursor = None
+        self.num_pages = 1
+
+    def cursor_values(self, row):
+        raise NotImplementedError
+
+    def parse_values(self, values):
+        return values
+
+    def fetch(self, values, direction, limit):
+        """Первые `limit` записей после `values` в порядке обхода."""
+        raise NotImplementedError
+
+    def transform(self, rows):
+        """Превращает выбранные записи в объекты страницы."""
+        return rows
+
+    def encode_cursor(self, row, direction):
+        values = [
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in self.cursor_values(row)
+        ]
+        raw = json.dumps([direction, values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        padded = cursor + '=' * (-len(cursor) % 4)
+        try:
+            direction, values = json.loads(
+                base64.urlsafe_b64decode(padded.encode())
+            )
+            if direction not in (NEXT, PREVIOUS):
+                raise InvalidCursor(cursor)
+            return direction, self.parse_values(values)
+        except (
+            binascii.Error, UnicodeDecodeError, TypeError, ValueError,
+            ValidationError,
+        ):
+            raise InvalidCursor(cursor)
+
+    def get_page(self, cursor):
+        try:
+            direction, values = self.decode_cursor(cursor or '')
+        except InvalidCursor:
+            direction, values = NEXT, None
+        rows = list(self.fetch(values, direction, self.per_page + 1))
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == PREVIOUS:
+            if not has_more:
+                return self.get_page(None)
+            rows.reverse()
+            has_next, has_previous = True, True
+        else:
+            has_next, has_previous = has_more, values is not None
+        if rows and has_next:
+            self.next_cursor = self.encode_cursor(rows[-1], NEXT)
+        if rows and has_previous:
+            self.previous_cursor = self.encode_cursor(rows[0], PREVIOUS)
+        number = 2 if has_previous else 1
+        self.num_pages = number + 1 if has_next else number
+        return Page(self.transform(rows), number, self)
+
+    page = get_page
+
+
+class CursorPaginator(BaseCursorPaginator):
+    """Keyset-паджинатор по полям сортировки модели.
+
+    Вместо OFFSET и COUNT(*) следующая страница выбирается условием
+    `(pub_date, id) < (последний pub_date, последний id)`, которое
+    опирается на индекс. Порядок берётся из `ordering`, затем из
+    `order_by()` запроса, затем из `Meta.ordering` модели; ключом могут
+    быть и аннотации запроса.
+    """
+
+    def __init__(self, object_list, per_page, ordering=None):
+        super().__init__(object_list, per_page)
+        self.ordering = tuple(
+            ordering
+            or object_list.query.order_by
+            or object_list.model._meta.ordering
+        )
+
+    def _fields(self):
+        opts = self.object_list.model._meta
+        annotations = self.object_list.query.annotations
+        for name in self.ordering:
+            attname = name.lstrip('-')
+            if attname in annotations:
+                field = annotations[attname].output_field
+            elif attname == 'pk':
+                field = opts.pk
+            else:
+                field = opts.get_field(attname)
+            yield attname, field, name.startswith('-')
+
+    def cursor_values(self, row):
+        return [getattr(row, attname) for attname, _, _ in self._fields()]
+
+    def parse_values(self, values):
+        fields = list(self._fields())
+        if len(values) != len(fields):
+            raise ValueError(values)
+        return [
+            field.to_python(value)
+            for (_, field, _), value in zip(fields, values)
+        ]
+
+    def _seek(self, values, direction):
+        """Строит условие «строго после курсора» в порядке выдачи."""
+        condition = Q()
+        equal = {}
+        for (attname, _, descending), value in zip(self._fields(), values):
+            lookup = 'lt' if descending == (direction == NEXT) else 'gt'
+            condition |= Q(**equal, **{f'{attname}__{lookup}': value})
+            equal[attname] = value
+        return self.object_list.filter(condition)
+
+    def _order(self, queryset, direction):
+        if direction == NEXT:
+            return queryset.order_by(*self.ordering)
+        return queryset.order_by(*(
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        ))
+
+    def fetch(self, values, direction, limit):
+        queryset = self.object_list
+        if values is not None:
+            queryset = self._seek(values, direction)
+        return self._order(queryset, direction)[:limit]
 
 
 def pagin_func(request, posts, posts_per_list):
-    paginator = Paginator(posts, posts_per_list)
+    """Возвращает страницу ленты.
+
+    По умолчанию используется курсорная паджинация; номерные страницы
+    включаются параметром `?page=` или настройкой `PAGINATION_MODE`.
+    """
     page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    if page_number or settings.PAGINATION_MODE == 'pages':
+        paginator = Paginator(posts, posts_per_list)
+        return paginator.get_page(page_number)
+    paginator = CursorPaginator(posts, posts_per_list)
+    return paginator.get_page(request.GET.get(CURSOR_PARAM))
@@ -2,26 +2,55 @@ from django.shortcuts import render, get_object_or_404
 from django.shortcuts import redirect
 from django.contrib.auth.decorators import login_required
 from django.conf import settings
-from django.views.decorators.cache import cache_page
-
+from django.db import transaction
+
+from . import feed, follows, page_cache, thumbnails, trending
+from .conditional import (
+    conditional_page, follow_validator, group_validator, index_validator,
+    post_validator, profile_validator, trending_validator,
+)
+from core.cache import shell_cache_page
+from core.db_router import pin_primary, read_replica
 from .forms import PostForm, CommentForm
-from .models import Post, Group, User, Comment, Follow
-from .utils import pagin_func
+from .models import MAX_DEPTH, Post, Group, User, Comment
+from .utils import CURSOR_PARAM, CursorPaginator, pagin_func
+from .view_counts import counted
 
 
-@cache_page(20 * 1)
+@read_replica
+@conditional_page(index_validator)
+@shell_cache_page(tags=page_cache.index_tags)
 def index(request):
-    post_list = Post.objects.all()
+    post_list = Post.objects.for_feed()
     page_obj = pagin_func(request, post_list, settings.COUNT_OF_MESSAGES)
     context = {
         'page_obj': page_obj,
+        'trending_groups': trending.groups(),
     }
     return render(request, 'posts/index.html', context)
 
 
+@read_replica
+@conditional_page(trending_validator)
+@shell_cache_page(tags=page_cache.trending_tags)
+def trending_list(request):
+    """Популярные посты в порядке, посчитанном заданием."""
+    page_obj = pagin_func(
+        request, trending.posts(), settings.COUNT_OF_MESSAGES
+    )
+    context = {
+        'page_obj': page_obj,
+        'trending_groups': trending.groups(),
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+@read_replica
+@conditional_page(group_validator)
+@shell_cache_page(tags=page_cache.group_tags)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = group.posts.for_feed()
     page_obj = pagin_func(request, posts, settings.COUNT_OF_MESSAGES)
     context = {
         'group': group,
@@ -30,45 +59,78 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@read_replica
+@conditional_page(profile_validator)
+@shell_cache_page(tags=page_cache.profile_tags)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    following = (
-        request.user.is_authenticated
-        and Follow.objects.filter(author=author).exists()
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username
     )
+    post_list = author.posts.for_feed()
     page_obj = pagin_func(request, post_list, settings.COUNT_OF_MESSAGES)
     context = {
         'author': author,
         'page_obj': page_obj,
-        'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@counted
+@read_replica
+@conditional_page(post_validator)
+@shell_cache_page(tags=page_cache.post_detail_tags)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    form = CommentForm(request.POST or None)
-    comments = Comment.objects.filter(post=post)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'),
+        id=post_id
+    )
     context = {
         'post': post,
-        'form': form,
-        'comments': comments,
+        'comments': comment_page(post.pk),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def comment_page(post_id, cursor=None):
+    """Страница веток комментариев поста после курсора."""
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).threaded(),
+        settings.COMMENTS_PER_PAGE,
+        ordering=('path',),
+    )
+    return paginator.get_page(cursor)
+
+
+@read_replica
+@conditional_page(post_validator)
+@shell_cache_page(tags=page_cache.comments_tags)
+def comment_list(request, post_id):
+    """Следующая страница комментариев — фрагмент для подгрузки."""
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    context = {
+        'post_id': post_id,
+        'comments': comment_page(post_id, request.GET.get(CURSOR_PARAM)),
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
+@pin_primary
 @login_required
+@transaction.atomic
 def post_create(request):
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
+        upload_errors=getattr(request, 'upload_errors', None),
     )
     if request.method == 'POST':
         if form.is_valid():
             post = form.save(commit=False)
             post.author = request.user
             post.save()
+            if 'image' in form.changed_data:
+                thumbnails.schedule(post)
             return redirect('posts:profile', post.author)
     context = {
         'form': form
@@ -76,7 +138,9 @@ def post_create(request):
     return render(request, 'posts/create_post.html', context)
 
 
+@pin_primary
 @login_required
+@transaction.atomic
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     if post.author != request.user:
@@ -84,12 +148,15 @@ def post_edit(request, post_id):
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
-        instance=post
+        instance=post,
+        upload_errors=getattr(request, 'upload_errors', None),
     )
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post)
         return redirect('posts:post_detail', post.pk)
     is_edit = True
     context = {
@@ -100,7 +167,9 @@ def post_edit(request, post_id):
     return render(request, 'posts/create_post.html', context)
 
 
+@pin_primary
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -108,13 +177,28 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
+        comment.parent = reply_parent(post, request.POST.get('parent'))
         comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def reply_parent(post, parent_id):
+    """Комментарий, на который отвечают; слишком глубокие ответы
+    прикрепляются к предку на предельной глубине."""
+    if not parent_id or not parent_id.isdigit():
+        return None
+    parent = Comment.objects.filter(post=post, pk=parent_id).first()
+    if parent is not None and parent.depth >= MAX_DEPTH:
+        return parent.parent
+    return parent
+
+
+@read_replica
 @login_required
+@conditional_page(follow_validator)
+@shell_cache_page(tags=page_cache.follow_tags, per_user=True)
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
+    post_list = feed.follow_feed(request.user).for_feed()
     page_obj = pagin_func(request, post_list, settings.COUNT_OF_MESSAGES)
     context = {
         'page_obj': page_obj,
@@ -122,22 +206,19 @@ def follow_index(request):
     return render(request, 'posts/follow.html', context)
 
 
+@pin_primary
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
-    user = request.user
     author = get_object_or_404(User, username=username)
-    if author == user:
-        return redirect('posts:follow_index')
-    if author.pk not in (
-        request.user.follower.all().values_list('author', flat=True)
-    ):
-        Follow.objects.create(user=user, author=author)
+    follows.follow(request.user, [author])
     return redirect('posts:follow_index')
 
 
+@pin_primary
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    if Follow.objects.filter(author__following__user=request.user).exists():
-        Follow.objects.filter(user=request.user, author=author).delete()
+    follows.unfollow(request.user, [author])
     return redirect('posts:follow_index')
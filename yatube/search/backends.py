@@ -0,0 +1,207 @@
+"""Бэкенды полнотекстового поиска по постам.
+
+Поиск идёт по тексту поста, комментариям к нему, названию группы и
+имени автора; результат — посты, упорядоченные по релевантности.
+Бэкенд выбирается настройкой `SEARCH_BACKEND`.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.functional import SimpleLazyObject
+from django.utils.module_loading import import_string
+
+from posts.models import Post
+from posts.utils import NEXT
+
+BATCH_SIZE = 1000
+
+
+def post_document(post):
+    """Индексируемые поля поста; ожидает загруженных автора и группу."""
+    author = post.author
+    names = (author.username, author.first_name, author.last_name)
+    return {
+        'text': post.text,
+        'group_title': post.group.title if post.group_id else '',
+        'author': ' '.join(name for name in names if name),
+    }
+
+
+class BaseSearchBackend:
+    def index_posts(self, posts):
+        raise NotImplementedError
+
+    def remove_post(self, post_id):
+        raise NotImplementedError
+
+    def index_comments(self, comments):
+        raise NotImplementedError
+
+    def remove_comment(self, comment_id):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def search(self, query, after, direction, limit):
+        """Список пар `(score, post_id)` после курсора `after`.
+
+        Меньший score — более релевантный пост; при равенстве порядок
+        задаёт post_id.
+        """
+        raise NotImplementedError
+
+
+class FTS5Backend(BaseSearchBackend):
+    """Инвертированный индекс на виртуальной таблице SQLite FTS5.
+
+    Пост и комментарий лежат в одной таблице с rowid `2 * id` и
+    `2 * id + 1`, так что обновление и удаление документа идут по
+    первичному ключу индекса, без сканирования.
+    """
+
+    table = 'search_document'
+    # Веса колонок для bm25: post_id, text, comments, group_title, author.
+    weights = (0.0, 1.0, 0.5, 0.8, 0.8)
+
+    @staticmethod
+    def match_expression(query):
+        """Превращает ввод пользователя в безопасный запрос FTS5.
+
+        Каждое слово ищется как префикс — для русского языка это
+        заменяет стемминг.
+        """
+        words = re.findall(r'\w+', query.lower())
+        return ' '.join(f'"{word}"*' for word in words)
+
+    def _execute_many(self, sql, params):
+        # Не executemany: курсоры-обёртки (debug toolbar) не умеют
+        # показывать его параметры и падают.
+        with connection.cursor() as cursor:
+            for row in params:
+                cursor.execute(sql, row)
+
+    def _delete(self, rowids):
+        self._execute_many(
+            f'DELETE FROM {self.table} WHERE rowid = %s',
+            [(rowid,) for rowid in rowids],
+        )
+
+    def index_posts(self, posts):
+        rows = []
+        for post in posts:
+            document = post_document(post)
+            rows.append((
+                2 * post.pk, post.pk, document['text'],
+                document['group_title'], document['author'],
+            ))
+        self._delete(row[0] for row in rows)
+        self._execute_many(
+            f'INSERT INTO {self.table} '
+            '(rowid, post_id, text, comments, group_title, author) '
+            "VALUES (%s, %s, %s, '', %s, %s)",
+            rows,
+        )
+
+    def remove_post(self, post_id):
+        self._delete([2 * post_id])
+
+    def index_comments(self, comments):
+        rows = [
+            (2 * comment.pk + 1, comment.post_id, comment.text)
+            for comment in comments
+        ]
+        self._delete(row[0] for row in rows)
+        self._execute_many(
+            f'INSERT INTO {self.table} '
+            '(rowid, post_id, text, comments, group_title, author) '
+            "VALUES (%s, %s, '', %s, '', '')",
+            rows,
+        )
+
+    def remove_comment(self, comment_id):
+        self._delete([2 * comment_id + 1])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def search(self, query, after, direction, limit):
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+        weights = ', '.join(str(weight) for weight in self.weights)
+        params = [expression]
+        having = ''
+        if after is not None:
+            op = '>' if direction == NEXT else '<'
+            having = (
+                f'HAVING score {op} %s OR (score = %s AND post_id {op} %s)'
+            )
+            params += [after[0], after[0], after[1]]
+        order = 'score, post_id' if direction == NEXT else (
+            'score DESC, post_id DESC'
+        )
+        params.append(limit)
+        # LIMIT -1 не даёт SQLite развернуть подзапрос: bm25 нельзя
+        # вызывать внутри агрегатной функции.
+        sql = (
+            'SELECT MIN(rank) AS score, post_id FROM ('
+            f'SELECT post_id, bm25({self.table}, {weights}) AS rank '
+            f'FROM {self.table} WHERE {self.table} MATCH %s LIMIT -1'
+            f') GROUP BY post_id {having} ORDER BY {order} LIMIT %s'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+class SimpleBackend(BaseSearchBackend):
+    """Поиск через `icontains` для баз без полнотекстового индекса.
+
+    Индекс не ведёт, релевантность не считает: посты идут по id.
+    """
+
+    def index_posts(self, posts):
+        pass
+
+    def remove_post(self, post_id):
+        pass
+
+    def index_comments(self, comments):
+        pass
+
+    def remove_comment(self, comment_id):
+        pass
+
+    def clear(self):
+        pass
+
+    def search(self, query, after, direction, limit):
+        query = query.strip()
+        if not query:
+            return []
+        posts = Post.objects.filter(
+            Q(text__icontains=query)
+            | Q(comments__text__icontains=query)
+            | Q(group__title__icontains=query)
+            | Q(author__username__icontains=query)
+            | Q(author__first_name__icontains=query)
+            | Q(author__last_name__icontains=query)
+        ).distinct()
+        if direction == NEXT:
+            if after is not None:
+                posts = posts.filter(pk__gt=after[1])
+            posts = posts.order_by('pk')
+        else:
+            posts = posts.filter(pk__lt=after[1]).order_by('-pk')
+        return [
+            (0.0, pk) for pk in posts.values_list('pk', flat=True)[:limit]
+        ]
+
+
+backend = SimpleLazyObject(
+    lambda: import_string(settings.SEARCH_BACKEND)()
+)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Comment, Post
+from search.backends import BATCH_SIZE, backend
+from search.tasks import in_batches, reindex
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов и комментариев'
+
+    def handle(self, *args, **options):
+        backend.clear()
+        reindex(Post.objects.all())
+        in_batches(
+            backend.index_comments,
+            Comment.objects.only('post_id', 'text').iterator(
+                chunk_size=BATCH_SIZE
+            ),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {Post.objects.count()}, '
+            f'комментариев: {Comment.objects.count()}'
+        ))
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+from search.backends import FTS5Backend
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS5Backend.table} USING fts5('
+        'post_id UNINDEXED, text, comments, group_title, author, '
+        "tokenize='unicode61 remove_diacritics 2')"
+    )
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    backend = FTS5Backend()
+    backend.index_posts(
+        Post.objects.select_related('author', 'group').iterator()
+    )
+    backend.index_comments(Comment.objects.iterator())
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS5Backend.table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_postimagevariant'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,46 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from jobs.queue import enqueue
+from posts.models import Comment, Group, Post, User
+from . import tasks
+from .backends import backend
+
+NAME_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        backend.index_posts([instance])
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    backend.remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        backend.index_comments([instance])
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    backend.remove_comment(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        enqueue(tasks.reindex_group, instance.pk)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, raw=False,
+               **kwargs):
+    if created or raw:
+        return
+    if update_fields is None or NAME_FIELDS & set(update_fields):
+        enqueue(tasks.reindex_author, instance.pk)
@@ -0,0 +1,42 @@
+"""Задачи очереди для поискового индекса.
+
+Название группы и имя автора входят в документы всех их постов, а постов
+может быть сколько угодно, поэтому после переименования посты
+переиндексируются заданием, а не в запросе.
+"""
+from itertools import islice
+
+from django.db import transaction
+
+from jobs.queue import PRIORITY_LOW, task
+from posts.models import Post
+from .backends import BATCH_SIZE, backend
+
+
+def in_batches(method, objects):
+    """Передаёт объекты в индекс пачками, по транзакции на пачку."""
+    iterator = iter(objects)
+    while True:
+        batch = list(islice(iterator, BATCH_SIZE))
+        if not batch:
+            return
+        with transaction.atomic():
+            method(batch)
+
+
+def reindex(posts):
+    posts = posts.select_related('author', 'group').only(
+        'text', 'group__title', 'author__username',
+        'author__first_name', 'author__last_name',
+    )
+    in_batches(backend.index_posts, posts.iterator(chunk_size=BATCH_SIZE))
+
+
+@task(priority=PRIORITY_LOW)
+def reindex_group(group_id):
+    reindex(Post.objects.filter(group_id=group_id))
+
+
+@task(priority=PRIORITY_LOW)
+def reindex_author(author_id):
+    reindex(Post.objects.filter(author_id=author_id))
@@ -0,0 +1,133 @@
+import os
+import runpy
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, Client, override_settings
+from django.urls import reverse
+
+from jobs import queue
+from jobs.models import Job
+from posts.models import Comment, Group, Post, User
+from . import tasks
+from .backends import FTS5Backend
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='Writer', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Рыбалка', slug='fishing', description='Описание'
+        )
+        cls.fish = Post.objects.create(
+            author=cls.author, group=cls.group, text='Поймал щуку на спиннинг'
+        )
+        cls.other = Post.objects.create(
+            author=cls.author, text='Про погоду и ЩУКУ в пруду'
+        )
+
+    def setUp(self):
+        self.client = Client()
+
+    def search(self, query, **params):
+        response = self.client.get(
+            reverse('search:search'), {'q': query, **params}
+        )
+        return response, list(response.context['page_obj'] or [])
+
+    def test_finds_posts_by_text_prefix_and_case(self):
+        """Поиск ищет по префиксам слов без учёта регистра."""
+        _, posts = self.search('щук')
+        self.assertEqual(set(posts), {self.fish, self.other})
+
+    def test_finds_by_group_author_and_comment(self):
+        """В индексе есть группа, имя автора и комментарии."""
+        self.assertEqual(self.search('рыбалка')[1], [self.fish])
+        self.assertEqual(len(self.search('толстой')[1]), 2)
+        Comment.objects.create(
+            post=self.other, author=self.author, text='Отличный карась'
+        )
+        self.assertEqual(self.search('карась')[1], [self.other])
+
+    def test_index_follows_updates_and_deletes(self):
+        """Правка поста, группы и автора сразу видна в поиске."""
+        self.fish.text = 'Сходил за грибами'
+        self.fish.save()
+        self.assertEqual(self.search('грибами')[1], [self.fish])
+        self.group.title = 'Тихая охота'
+        self.group.save()
+        self.assertEqual(self.search('охота')[1], [self.fish])
+        self.author.last_name = 'Гоголь'
+        self.author.save()
+        self.assertEqual(len(self.search('гоголь')[1]), 2)
+        self.other.delete()
+        self.assertEqual(self.search('гоголь')[1], [self.fish])
+
+    @override_settings(JOBS_EAGER=False)
+    def test_renames_reindexed_by_jobs(self):
+        """Переименование группы и автора переиндексирует посты заданием,
+        а не в запросе."""
+        self.group.title = 'Тихая охота'
+        self.group.save()
+        self.author.last_name = 'Гоголь'
+        self.author.save()
+        self.assertEqual(self.search('охота')[1], [])
+        self.assertEqual(
+            sorted(Job.objects.filter(name__startswith='search.').values_list(
+                'name', flat=True
+            )),
+            [tasks.reindex_author.job_name, tasks.reindex_group.job_name],
+        )
+        queue.work(burst=True)
+        self.assertEqual(self.search('охота')[1], [self.fish])
+        self.assertEqual(len(self.search('гоголь')[1]), 2)
+
+    @override_settings(COUNT_OF_MESSAGES=1)
+    def test_results_are_cursor_paginated(self):
+        """Результаты листаются курсором без повторов."""
+        response, first = self.search('толстой')
+        cursor = response.context['page_obj'].paginator.next_cursor
+        _, second = self.search('толстой', cursor=cursor)
+        self.assertEqual(len(first + second), 2)
+        self.assertNotEqual(first, second)
+
+    def test_query_is_sanitized(self):
+        """Служебный синтаксис FTS5 в запросе не ломает поиск."""
+        self.assertEqual(
+            FTS5Backend.match_expression('щука" OR NEAR(*'),
+            '"щука"* "or"* "near"*',
+        )
+        response, posts = self.search('"*')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(posts, [])
+
+    def test_rebuild_command(self):
+        """Команда перестраивает индекс с нуля."""
+        FTS5Backend().clear()
+        self.assertEqual(self.search('щук')[1], [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.search('щук')[1]), 2)
+
+
+class SearchBackendSettingTests(SimpleTestCase):
+    def load_settings(self, engine):
+        path = os.path.join(settings.BASE_DIR, 'yatube', 'settings.py')
+        with mock.patch.dict(os.environ, {'DB_ENGINE': engine}):
+            return runpy.run_path(path)
+
+    def test_backend_follows_db_engine(self):
+        """FTS5 есть только в SQLite, на других СУБД — запасной бэкенд."""
+        backends = {
+            'sqlite3': 'search.backends.FTS5Backend',
+            'postgresql': 'search.backends.SimpleBackend',
+        }
+        for engine, backend in backends.items():
+            with self.subTest(engine=engine):
+                self.assertEqual(
+                    self.load_settings(engine)['SEARCH_BACKEND'], backend
+                )
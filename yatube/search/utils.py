@@ -0,0 +1,28 @@
+from posts.models import Post
+from posts.utils import BaseCursorPaginator
+
+from .backends import backend
+
+
+class SearchPaginator(BaseCursorPaginator):
+    """Курсорная паджинация результатов поиска.
+
+    Ключ сортировки — пара `(score, post_id)`, поэтому следующая страница
+    берётся из индекса условием на релевантность, а не через OFFSET.
+    """
+
+    def cursor_values(self, row):
+        return list(row)
+
+    def parse_values(self, values):
+        score, post_id = values
+        return [float(score), int(post_id)]
+
+    def fetch(self, values, direction, limit):
+        return backend.search(self.object_list, values, direction, limit)
+
+    def transform(self, rows):
+        posts = Post.objects.for_feed().in_bulk(
+            [post_id for _, post_id in rows]
+        )
+        return [posts[post_id] for _, post_id in rows if post_id in posts]
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.shortcuts import render
+
+from posts.utils import CURSOR_PARAM
+from .utils import SearchPaginator
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        paginator = SearchPaginator(query, settings.COUNT_OF_MESSAGES)
+        page_obj = paginator.get_page(request.GET.get(CURSOR_PARAM))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'search/results.html', context)
@@ -35,6 +35,60 @@ ALLOWED_HOSTS = [
 # A count of displayed messages on index page
 COUNT_OF_MESSAGES: int = 10
 
+# Comments shown on a post page; the rest are loaded page by page
+COMMENTS_PER_PAGE = 50
+
+# Feed pagination mode: 'cursor' (keyset) or 'pages' (numbered pages)
+PAGINATION_MODE = 'cursor'
+
+# Authors with at least this many followers are not fanned out to
+# follower timelines; their posts are merged into the feed on read
+FEED_FANOUT_LIMIT = 10000
+
+# Followed author ids are cached per user for FOLLOW_CACHE_TIMEOUT seconds
+# (dropped on every follow change); bulk follow requests take at most
+# FOLLOW_BULK_LIMIT usernames
+FOLLOW_CACHE_TIMEOUT = 24 * 60 * 60
+FOLLOW_BULK_LIMIT = 1000
+
+# Who-to-follow suggestions (posts.recommendations): how many are stored
+# per user and shown, followers sampled per author for co-follow
+# similarity, its weight against friends-of-friends, and how often the
+# periodic job recomputes them (seconds)
+RECOMMENDATIONS_SIZE = 20
+RECOMMENDATIONS_SHOWN = 5
+RECOMMENDATIONS_SAMPLE = 200
+RECOMMENDATIONS_COFOLLOW_WEIGHT = 1.0
+RECOMMENDATIONS_INTERVAL = 6 * 60 * 60
+
+# Post views are buffered in each process and added to the counters in
+# batches every VIEWS_FLUSH_INTERVAL seconds or once VIEWS_FLUSH_SIZE posts
+# are pending (posts.view_counts)
+VIEWS_FLUSH_INTERVAL = 10
+VIEWS_FLUSH_SIZE = 1000
+# Flush the buffer once more when a worker process exits normally, so an
+# idle worker does not lose its views on restart
+VIEWS_FLUSH_AT_EXIT = True
+
+# Trending posts and groups (posts.trending): events of the last
+# TRENDING_WINDOW seconds count with weights halving every
+# TRENDING_HALF_LIFE seconds; the periodic job recomputes the rankings
+# every TRENDING_INTERVAL seconds and keeps the TRENDING_SIZE best posts
+# and TRENDING_GROUPS_SHOWN best groups
+TRENDING_WINDOW = 48 * 60 * 60
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_COMMENT_WEIGHT = 1.0
+TRENDING_FOLLOWER_WEIGHT = 2.0
+# Views are cheap and plentiful, so a single view weighs much less than
+# a comment
+TRENDING_VIEW_WEIGHT = 0.05
+TRENDING_INTERVAL = 5 * 60
+TRENDING_SIZE = 100
+TRENDING_GROUPS_SHOWN = 5
+
+# Largest page the JSON API returns for ?limit=
+API_MAX_PAGE_SIZE = 100
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -48,11 +102,15 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'search.apps.SearchConfig',
+    'api.apps.ApiConfig',
+    'jobs.apps.JobsConfig',
     'sorl.thumbnail',
     'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,6 +119,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
+    'core.db_router.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -90,13 +149,70 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Engine is 'sqlite3' or 'postgresql' (wrappers from core.db_backends).
+# Connections are kept for DB_CONN_MAX_AGE seconds and checked before
+# reuse; SQLite connections are also pooled (DB_POOL_SIZE, 0 disables)
+# and tuned with pragmas and write-locking transactions (DB_SQLITE_TUNING=0
+# restores SQLite defaults)
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite3')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'ENGINE': f'core.db_backends.{DB_ENGINE}',
+        'NAME': os.environ.get(
+            'DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')
+        ),
+        'USER': os.environ.get('DB_USER', ''),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': os.environ.get('DB_HOST', ''),
+        'PORT': os.environ.get('DB_PORT', ''),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'POOL_SIZE': int(os.environ.get('DB_POOL_SIZE', 8)),
     }
 }
 
+if DB_ENGINE == 'sqlite3' and os.environ.get('DB_SQLITE_TUNING', '1') == '1':
+    DATABASES['default']['PRAGMAS'] = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,
+        'busy_timeout': 5000,
+        'temp_store': 'MEMORY',
+    }
+    DATABASES['default']['TRANSACTION_MODE'] = 'IMMEDIATE'
+
+# Read replicas: comma-separated file names (sqlite3) or hosts (postgresql).
+# Views marked with core.db_router.read_replica read the apps listed in
+# DATABASE_REPLICA_APPS from a replica; after a view marked pin_primary
+# the client reads from 'default' for DATABASE_PRIMARY_PIN seconds.
+# Users and sessions always come from 'default': auth views (signup,
+# password change and reset) are not pinned, and a lagging password hash
+# would log the user out on the next page
+DATABASE_REPLICAS = []
+for number, replica in enumerate(
+    filter(None, os.environ.get('DB_REPLICAS', '').split(',')), 1
+):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME' if DB_ENGINE == 'sqlite3' else 'HOST': replica,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+DATABASE_REPLICA_APPS = ['posts']
+DATABASE_PRIMARY_PIN = 10
+
+# Full-text search backend follows the engine: SQLite FTS5 index, or the
+# icontains fallback for other databases
+if DB_ENGINE == 'sqlite3':
+    SEARCH_BACKEND = 'search.backends.FTS5Backend'
+else:
+    SEARCH_BACKEND = 'search.backends.SimpleBackend'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -136,7 +252,9 @@ LOGIN_REDIRECT_URL = 'posts:index'
 
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Letters are queued as jobs and sent by a worker with JOBS_EMAIL_BACKEND
+EMAIL_BACKEND = 'jobs.mail.QueuedEmailBackend'
+JOBS_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 # Static files (CSS, JavaScript, Images)
@@ -151,12 +269,98 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# The default cache is shared between all workers: by default it is a
+# table in the project database (run `manage.py createcachetable` once),
+# in production point CACHE_BACKEND/CACHE_LOCATION to memcached or redis.
+# Template fragments are versioned by key, so a per-process cache is enough.
+CACHE_BACKEND = os.environ.get(
+    'CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'
+)
 CACHES = {
     'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'yatube_cache'),
+    },
+    'template_fragments': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'template_fragments',
+    },
+}
+
+# The database cache culls past MAX_ENTRIES (Django's default is 300):
+# expired rows first, then a tenth of the table. Size it for page shells
+# plus a tag version per user; culled tag versions and the popular
+# authors list are rebuilt on a miss
+if CACHE_BACKEND.endswith('.DatabaseCache'):
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 200000)),
+        'CULL_FREQUENCY': 10,
     }
+
+# Page cache stampede protection: XFetch early-expiry factor, how long a
+# stale page may be served while it is being rebuilt, and the rebuild
+# lock timeout (seconds)
+PAGE_CACHE_BETA = 1.0
+PAGE_CACHE_GRACE = 60
+PAGE_CACHE_LOCK_TTL = 10
+
+# Background jobs (thumbnails, feed fan-out, email) wait in the queue for
+# `manage.py run_jobs` with JOBS_WORKERS processes. JOBS_EAGER=1 runs them
+# inline at enqueue time, inside the request; only the test settings
+# (yatube.settings_test) turn it on. Failed jobs are retried
+# up to JOBS_MAX_ATTEMPTS times with exponential backoff from
+# JOBS_RETRY_DELAY to JOBS_RETRY_MAX_DELAY seconds; a job locked for longer
+# than JOBS_LOCK_TIMEOUT seconds is considered lost and requeued
+JOBS_EAGER = os.environ.get('JOBS_EAGER', '0') == '1'
+JOBS_WORKERS = int(os.environ.get('JOBS_WORKERS', 2))
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_DELAY = 10
+JOBS_RETRY_MAX_DELAY = 60 * 60
+JOBS_LOCK_TIMEOUT = 10 * 60
+JOBS_POLL_INTERVAL = 1
+
+# Feed and post pages are cached as shared shells with per-user fragments
+# and dropped by tag on writes, so the timeout is only a safety net.
+# PAGE_CACHE_ENABLED=False renders every page (used by bench_views)
+PAGE_CACHE_TIMEOUT = 60 * 60
+PAGE_CACHE_ENABLED = True
+
+# Request metrics (core.metrics): share of requests measured (0 turns
+# measuring off) and URL namespaces they are collected for. /metrics/
+# serves them in Prometheus text format to staff users and to scrapers
+# sending "Authorization: Bearer <METRICS_TOKEN>"; without a token only
+# staff can read them
+METRICS_SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', 1))
+METRICS_NAMESPACES = ['posts', 'users', 'about']
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Post image thumbnails: name -> (geometry, sorl-thumbnail options).
+# They are pre-generated by a background job right after an image is saved
+POST_THUMBNAILS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
 }
 
+# Responsive post image variants built by the same pipeline: widths,
+# formats in order of preference (formats Pillow cannot write are skipped),
+# encoder quality and the `sizes` attribute of the emitted <source> tags
+POST_IMAGE_WIDTHS = (480, 960, 1440)
+POST_IMAGE_FORMATS = ('AVIF', 'WEBP', 'JPEG')
+POST_IMAGE_QUALITY = 80
+POST_IMAGE_SIZES = '(max-width: 992px) 100vw, 960px'
+
+# Upload limits: uploads are checked while streaming (signature and size),
+# resolution is read from the image header; stored images are re-encoded
+# without EXIF and downscaled to POST_IMAGE_MAX_SIDE in the background
+POST_IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 40_000_000
+POST_IMAGE_MAX_SIDE = 2560
+
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.ImageUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ] 
@@ -0,0 +1,6 @@
+"""Настройки тестов: задания очереди выполняются сразу, без воркеров."""
+from .settings import *  # noqa: F401,F403
+
+JOBS_EAGER = True
+# Тестовая база к выходу уже удалена.
+VIEWS_FLUSH_AT_EXIT = False